@@ -4,8 +4,9 @@ from os import urandom
 from typing import Optional, Dict, Tuple, Union, TypeVar
 from zipfile import ZipFile, ZIP_DEFLATED
 from io import BytesIO
-from ujson import dumps
+from . import codec
 from aiofile import async_open
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
 from hashlib import sha1
 
 SIG_KEY = bytes.fromhex("DFA5ED192DDA6E88A12FE12130DC6206B1251E44")
@@ -22,13 +23,38 @@ def generate_device_id(device_info: Optional[str] = None) -> str:
 
 DEVICE_ID = generate_device_id()
 
-def generate_signature(data: str):
-    signature = b64encode(
-        PREFIX_BYTES +
-        new(SIG_KEY, data.encode("utf-8"), sha1).digest()).decode("utf-8")
+# Bodies with more media than this are encoded and signed in a thread.
+OFFLOAD_SIZE = 256 * 1024
+# A multiple of 3, so the base64 of the chunks can be joined.
+ENCODE_CHUNK = 3 * 64 * 1024
+
+
+def generate_signature(data: Union[str, bytes]):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    signature = b64encode(PREFIX_BYTES +
+                          new(SIG_KEY, data, sha1).digest()).decode("utf-8")
     return signature
 
 
+def encode_json(data: Dict,
+                media: Optional[bytes] = None,
+                field: str = "mediaUploadValue") -> Tuple[bytes, str]:
+    """
+    Body of a signed request and its signature. ``media`` is put into the
+    body in base64 under ``field`` without going through the JSON encoder.
+    """
+    body = codec.encode(data)
+    if media is not None:
+        # Encoded in chunks so a thread doing this lets the loop run.
+        view = memoryview(media)
+        body = b''.join(
+            (body[:-1], b',"' if data else b'"', field.encode("utf-8"), b'":"',
+             *(b64encode(view[start:start + ENCODE_CHUNK])
+               for start in range(0, len(view), ENCODE_CHUNK)), b'"}'))
+    return body, generate_signature(body)
+
+
 class SourceTypes:
     USER_PROFILE: str = "UserProfileView"
     DETAIL_POST: str = "PostDetailView"
@@ -47,11 +73,18 @@ class ContentType:
 
 class InvalidRequest(Exception):
 
-    def __init__(self, message: str, status: int, json: Dict) -> None:
+    def __init__(self,
+                 message: str,
+                 status: int,
+                 json: Dict,
+                 http_status: Optional[int] = None,
+                 retry_after: Optional[float] = None) -> None:
         super().__init__(message)
         self.message = message
         self.status = status
         self.json = json
+        self.http_status = http_status
+        self.retry_after = retry_after
 
 
 class WebSocketConnectError(Exception):
@@ -63,9 +96,69 @@ class SpecifyType(Exception):
 
 
 class HtmlError(Exception):
+
+    def __init__(self,
+                 text: str,
+                 http_status: Optional[int] = None,
+                 retry_after: Optional[float] = None) -> None:
+        super().__init__(text)
+        self.http_status = http_status
+        self.retry_after = retry_after
+
+
+class CircuitOpen(Exception):
     pass
 
 
+class FileTooLarge(Exception):
+    pass
+
+
+class SessionConfig:
+    """
+    Connection pool and timeout settings of the aiohttp session shared by
+    every client of a bot. The defaults are aiohttp's own. None disables a
+    timeout, and unlike in aiohttp ``ttl_dns_cache=None`` disables the DNS
+    cache.
+    """
+
+    __slots__ = ('limit', 'limit_per_host', 'ttl_dns_cache',
+                 'keepalive_timeout', 'connect_timeout',
+                 'sock_connect_timeout', 'read_timeout', 'total_timeout')
+
+    def __init__(self,
+                 limit: int = 100,
+                 limit_per_host: int = 0,
+                 ttl_dns_cache: Optional[int] = 10,
+                 keepalive_timeout: float = 15,
+                 connect_timeout: Optional[float] = None,
+                 sock_connect_timeout: Optional[float] = 30,
+                 read_timeout: Optional[float] = None,
+                 total_timeout: Optional[float] = 300) -> None:
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.ttl_dns_cache = ttl_dns_cache
+        self.keepalive_timeout = keepalive_timeout
+        self.connect_timeout = connect_timeout
+        self.sock_connect_timeout = sock_connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+
+    def create_session(self) -> ClientSession:
+        connector = TCPConnector(limit=self.limit,
+                                 limit_per_host=self.limit_per_host,
+                                 ttl_dns_cache=self.ttl_dns_cache,
+                                 use_dns_cache=self.ttl_dns_cache is not None,
+                                 keepalive_timeout=self.keepalive_timeout)
+        timeout = ClientTimeout(total=self.total_timeout,
+                                connect=self.connect_timeout,
+                                sock_connect=self.sock_connect_timeout,
+                                sock_read=self.read_timeout)
+        return ClientSession(connector=connector,
+                             timeout=timeout,
+                             json_serialize=codec.dumps)
+
+
 class Embed:
     __slots__ = ('object_id', 'object_type', 'link', 'title', 'content',
                  'image')
@@ -197,7 +290,7 @@ class File:
 
 
 class LinkSnippet:
-    __slots__ = ('link', 'media_upload_value', 'media_type',
+    __slots__ = ('link', 'media', 'media_type',
                  'media_upload_value_content_type')
 
     def __init__(self,
@@ -205,11 +298,16 @@ class LinkSnippet:
                  media_upload_value: bytes,
                  media_type: int = 100,
                  media_upload_value_content_type: str = "image/png"):
+        # Encoded when the message is sent, off the loop if it is large.
         self.link = link
-        self.media_upload_value = b64encode(media_upload_value).decode()
+        self.media = media_upload_value
         self.media_type = media_type
         self.media_upload_value_content_type = media_upload_value_content_type
 
+    @property
+    def media_upload_value(self) -> str:
+        return b64encode(self.media).decode()
+
     def dict(self) -> Dict:
         return {
             "link": self.link,
@@ -345,7 +443,7 @@ class ChatBubbleConfig:
             else:
                 zip_arc.writestr('background.png', self.image)
                 config["backgroundPath"] = 'background.png'
-            zip_arc.writestr('config.json', dumps(config).encode())
+            zip_arc.writestr('config.json', codec.encode(config))
 
             if self.slots is not None:
                 for slot in self.slots:
@@ -0,0 +1,109 @@
+from inspect import signature, Parameter
+from re import compile
+from typing import Any, Callable, List, Tuple, Union, get_type_hints, get_origin, get_args
+
+__all__ = ['Arguments', 'ArgumentsNotFound']
+
+WORD = compile(r'\S+')
+GREEDY_NAME = 'args'
+REQUIRED = object()
+
+
+class ArgumentsNotFound(Exception):
+    pass
+
+
+def get_converter(annotation: Any) -> Tuple[Callable[[str], Any], bool]:
+    """
+    Returns the converter for the annotation and whether it is Optional.
+    """
+    if annotation is Parameter.empty or annotation is Any or isinstance(
+            annotation, str):
+        return str, False
+
+    if get_origin(annotation) is Union:
+        args = get_args(annotation)
+        types = tuple(arg for arg in args if arg is not type(None))
+        optional = len(types) != len(args)
+        if len(types) == 1:
+            return get_converter(types[0])[0], optional
+        return str, optional
+
+    return annotation, False
+
+
+class Arguments:
+    """
+    Argument plan of a command callback, compiled once at registration.
+
+    Every parameter after the context takes one word of the message and is
+    converted with its annotation. A parameter named ``args`` takes the rest
+    of the message as is. When the words run out, parameters with a default
+    get it, Optional ones get None and the rest raise ArgumentsNotFound.
+    """
+
+    __slots__ = ('name', 'names', 'converters', 'missing', 'greedy')
+
+    def __init__(self, callback: Callable) -> None:
+        try:
+            hints = get_type_hints(callback)
+        except Exception:
+            hints = {}
+
+        self.name = callback.__name__
+        self.names: List[str] = []
+        self.converters: List[Callable[[str], Any]] = []
+        self.missing: List[Any] = []
+        self.greedy = False
+
+        for parameter in tuple(signature(callback).parameters.values())[1:]:
+            if parameter.kind not in (Parameter.POSITIONAL_ONLY,
+                                      Parameter.POSITIONAL_OR_KEYWORD):
+                break
+
+            if parameter.name == GREEDY_NAME:
+                self.greedy = True
+                break
+
+            converter, optional = get_converter(
+                hints.get(parameter.name, parameter.annotation))
+
+            if parameter.default is not Parameter.empty:
+                missing = parameter.default
+            elif optional:
+                missing = None
+            else:
+                missing = REQUIRED
+
+            self.names.append(parameter.name)
+            self.converters.append(converter)
+            self.missing.append(missing)
+
+    def parse(self, content: str) -> List:
+        """
+        Converts the content following the command in a single pass.
+        """
+        args = []
+        end = 0
+
+        if self.converters:
+            words = WORD.finditer(content)
+            for converter in self.converters:
+                word = next(words, None)
+                if word is None:
+                    break
+                args.append(converter(word.group()))
+                end = word.end()
+
+            for index in range(len(args), len(self.converters)):
+                missing = self.missing[index]
+                if missing is REQUIRED:
+                    raise ArgumentsNotFound(
+                        f"{self.name}: argument {self.names[index]} not found."
+                    )
+                args.append(missing)
+
+        if self.greedy:
+            args.append(content[end:] if end else content)
+
+        return args
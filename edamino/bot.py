@@ -4,15 +4,27 @@ from re import search
 from time import time
 from os import environ
 
-from ujson import loads
 from .client import Client
 from .logger import logger as log
 from .context import Context
+from .router import CommandRouter
+from .arguments import Arguments, ArgumentsNotFound
+from .dispatcher import Dispatcher, Overflow
+from .views import View, Mode
+from .compact import CompactMessage
+from .connection import Connection
+from .waiters import Waiters
+from .retry import RetryPolicy
+from .limiter import RateLimiter
+from .cache import ResponseCache
+from .media import MediaCache
+from .codec import use as use_codec
 from .objects import Message, UserProfile, SocketAnswer
-from .api import MessageType, MediaType, WebSocketConnectError
+from .api import MessageType, MediaType, SessionConfig
 
 from dotenv import load_dotenv
-from asyncio import get_event_loop, AbstractEventLoop, iscoroutinefunction, Future, wait_for
+from asyncio import get_event_loop, AbstractEventLoop, iscoroutinefunction, Task, wait_for, gather, sleep
+from aiofile import async_open
 from collections import namedtuple
 from typing import Optional, List, Union, Tuple, Dict, Callable, Awaitable
 from functools import partial
@@ -22,14 +34,35 @@ __all__ = ['Bot']
 
 load_dotenv('.env')
 
-Handler = namedtuple(
-    'Handler',
-    ['commands', 'media_types', 'message_types', 'callback', 'description'])
+Handler = namedtuple('Handler', [
+    'commands', 'media_types', 'message_types', 'callback', 'description',
+    'arguments', 'lazy', 'compact'
+],
+                     defaults=(None, False, False))
 
 HANDLERS_COMMANDS: List[Handler] = []
 HANDLERS_EVENTS: List[Handler] = []
+COMMANDS_ROUTER = CommandRouter()
 CALLBACKS: List[Callable[[Client], Awaitable[None]]] = []
 
+SESSION_LIFETIME = 60 * 60 * 12
+SESSION_MARGIN = 60 * 30
+SESSION_RETRY = 30
+SESSION_RETRY_MAX = 60 * 15
+
+# Messages that change the chat they are sent to.
+CHAT_CHANGES = frozenset(
+    (MessageType.GROUP_MEMBER_JOIN, MessageType.GROUP_MEMBER_LEAVE,
+     MessageType.CHAT_BACKGROUND_CHANGED, MessageType.CHAT_TITLE_CHANGED,
+     MessageType.CHAT_ICON_CHANGED, MessageType.CHAT_CONTENT_CHANGED,
+     MessageType.CHAT_HOST_TRANSFERED, MessageType.CHAT_PIN_ANNOUNCEMENT,
+     MessageType.CHAT_UNPIN_ANNOUNCEMENT,
+     MessageType.VOICE_CHAT_PERMISSION_OPEN_TO_EVERYONE,
+     MessageType.VOICE_CHAT_PERMISSION_INVITED_AND_REQUESTED,
+     MessageType.VOICE_CHAT_PERMISSION_INVITE_ONLY,
+     MessageType.CHAT_VIEW_ONLY_ENABLED, MessageType.CHAT_VIEW_ONLY_DISABLED,
+     MessageType.CHAT_TIPPING_ENABLED, MessageType.CHAT_TIPPING_DISABLED))
+
 ON_READY: Optional[Callable] = None
 ON_MENTION: Optional[Callable[[Context], Awaitable[None]]] = None
 
@@ -42,31 +75,23 @@ class IsNotCoroutineFunction(Exception):
     pass
 
 
-class ArgumentsNotFound(Exception):
-    pass
-
-
-def get_annotations(handler: Handler, words: List[str], command: str,
-                    message: str) -> List:
-    args = []
-    for count, (name, annotation) in enumerate(
-        [item for item in handler.callback.__annotations__.items()][1:]):
-        if name == 'args':
-            string = message.replace(command, '', 1)
-            args.append(string)
-        else:
-            with suppress(IndexError):
-                word = words[count]
-                args.append(annotation(word))
-                message = message.replace(word, '', 1)
-    return args
+def get_thread_id(data: Dict) -> Optional[str]:
+    o = data.get('o')
+    if not isinstance(o, dict):
+        return None
+    message = o.get('chatMessage')
+    if isinstance(message, dict):
+        return message.get('threadId')
+    return o.get('threadId')
 
 
 class Bot:
     # Most of the features are taken from the amsync library :D
 
     __slots__ = ('email', 'password', 'prefix', 'loop', 'sid', 'uid',
-                 'timestamp', 'ws', 'client', 'futures', 'proxy')
+                 'timestamp', 'ws', 'client', 'waiters', 'proxy', 'dispatcher',
+                 'clients', 'session_task', 'session_config', 'retry',
+                 'limiter', 'cache', 'media_cache', 'mode')
 
     loop: Optional[AbstractEventLoop]
 
@@ -74,7 +99,20 @@ class Bot:
                  email: str,
                  password: str,
                  prefix: str = "",
-                 proxy: Optional[str] = None):
+                 proxy: Optional[str] = None,
+                 queue_size: int = 1000,
+                 workers: int = 16,
+                 overflow: str = Overflow.BLOCK,
+                 ordered: bool = False,
+                 session_config: Optional[SessionConfig] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 media_cache: Optional[MediaCache] = None,
+                 codec: Optional[str] = None,
+                 mode: str = Mode.MODEL):
+        if codec is not None:
+            use_codec(codec)
         self.uid = None
         self.sid = None
         self.loop = None
@@ -84,17 +122,41 @@ class Bot:
         self.timestamp = None
         self.ws = None
         self.proxy = proxy
-        self.futures: List[Future] = []
+        self.waiters = Waiters()
         self.client = None
+        self.clients: Dict[int, Client] = {}
+        self.session_task: Optional[Task] = None
+        self.session_config = session_config
+        # Shared by the clients of every community of this bot only.
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.cache = cache
+        self.media_cache = media_cache
+        self.mode = mode
+        self.dispatcher = Dispatcher(self.__call__handlers,
+                                     key=get_thread_id if ordered else None,
+                                     size=queue_size,
+                                     workers=workers,
+                                     overflow=overflow)
+
+    def get_client(self, ndc_id: int) -> Client:
+        client = self.clients.get(ndc_id)
+        if client is None:
+            client = self.clients[ndc_id] = self.client.with_ndc(ndc_id)
+        return client
+
+    def refresh_clients(self) -> None:
+        headers = self.client.headers
+        for client in self.clients.values():
+            client.headers = headers
 
     def get_context(self, client: Client, msg: Message, ws):
-        client_context = Client(session=client.session,
-                                device_id=client.device_id,
-                                com_id=msg.ndcId,
-                                proxy=self.proxy)
-        client_context.login_sid(self.sid, self.uid)
-        context = Context(msg=msg, client=client_context, ws=ws)
-        return context
+        return Context(msg=msg, client=self.get_client(msg.ndcId), ws=ws)
+
+    def invalidate_cache(self, data: Dict) -> None:
+        message = data['o']['chatMessage']
+        if message.get('type') in CHAT_CHANGES:
+            self.cache.invalidate('chat/thread', message.get('threadId'))
 
     def check_cfg(self):
         email = environ.get('email')
@@ -112,27 +174,59 @@ class Bot:
 
         try:
             self.timestamp = int(environ.get('timestamp'))
-            if time() - self.timestamp > 60 * 60 * 12:
+            if time() - self.timestamp > SESSION_LIFETIME:
                 self.sid = None
         except TypeError:
             self.timestamp = int(time())
             self.sid = None
 
-    def update_cfg(self):
+    def get_cfg(self) -> str:
         self.timestamp = int(time())
-        string = f"sid={self.sid}\n" \
-                 f"uid={self.uid}\n" \
-                 f"email={self.email}\n" \
-                 f"password={self.password}\n" \
-                 f"timestamp={self.timestamp}"
+        return f"sid={self.sid}\n" \
+               f"uid={self.uid}\n" \
+               f"email={self.email}\n" \
+               f"password={self.password}\n" \
+               f"timestamp={self.timestamp}"
 
+    def update_cfg(self):
         with open('.env', 'w') as file:
-            file.write(string)
+            file.write(self.get_cfg())
+
+    async def async_update_cfg(self):
+        async with async_open('.env', 'w') as file:
+            await file.write(self.get_cfg())
+
+    async def refresh_session(self) -> None:
+        await self.client.login(self.email, self.password)
+        self.sid = self.client.sid
+        self.uid = self.client.uid
+        self.refresh_clients()
+        await self.async_update_cfg()
+        log.info("Session refreshed.")
+
+    async def keep_session(self) -> None:
+        """
+        Logs in again before the session expires. Handlers keep running on
+        the old sid until the new one is swapped into every client.
+        """
+        delay = SESSION_RETRY
+        while True:
+            await sleep(self.timestamp + SESSION_LIFETIME - SESSION_MARGIN -
+                        time())
+            try:
+                await self.refresh_session()
+                delay = SESSION_RETRY
+            except Exception as error:
+                log.error(f"Session refresh failed: {error!r}")
+                await sleep(delay)
+                delay = min(delay * 2, SESSION_RETRY_MAX)
 
     @staticmethod
     def event(message_types: Optional[Union[List[int], Tuple[int,
                                                              ...]]] = None,
-              media_types: Optional[Union[List[int], Tuple[int, ...]]] = None):
+              media_types: Optional[Union[List[int], Tuple[int, ...]]] = None,
+              lazy: bool = False,
+              compact: bool = False):
 
         if not message_types:
             message_types = [MessageType.TEXT]
@@ -156,7 +250,9 @@ class Bot:
                               media_types=tuple(media_types),
                               message_types=tuple(message_types),
                               callback=callback,
-                              commands=None)
+                              commands=None,
+                              lazy=lazy,
+                              compact=compact)
             HANDLERS_EVENTS.append(handler)
             return callback
 
@@ -169,7 +265,9 @@ class Bot:
                                                                ...]]] = None,
                 media_types: Optional[Union[List[int], Tuple[int,
                                                              ...]]] = None,
-                prefix: Optional[str] = None):
+                prefix: Optional[str] = None,
+                lazy: bool = False,
+                compact: bool = False):
 
         if isinstance(commands, str):
             commands = [commands]
@@ -185,90 +283,112 @@ class Bot:
             if iscoroutinefunction(callback) is False:
                 raise IsNotCoroutineFunction(callback.__name__)
 
-            current_command_list = [
-                item for item_list in HANDLERS_COMMANDS
-                for item in item_list.commands
-            ]
             for command in commands:
-                if command in current_command_list:
+                if command in COMMANDS_ROUTER:
                     raise TheCommandAlreadyExists(command)
 
             handler = Handler(commands=commands,
                               description=description,
                               media_types=tuple(media_types),
                               message_types=tuple(message_types),
-                              callback=callback)
+                              callback=callback,
+                              arguments=Arguments(callback),
+                              lazy=lazy,
+                              compact=compact)
             HANDLERS_COMMANDS.append(handler)
+            COMMANDS_ROUTER.add(handler, commands)
             return callback
 
         return register_handler
 
     async def __call__handlers(self, data: Dict):
-        s = SocketAnswer(**data)
-        if self.futures:
-            for future in self.futures:
-                future.set_result(s)
-            self.futures.clear()
-
-        if s.t == 1000:
-
-            msg = s.o.chatMessage
-            msg.ndcId = s.o.ndcId
-
-            if ON_MENTION is not None:
-                uids = ()
-                with suppress(Exception):
-                    uids = (u.uid for u in msg.extensions.mentionedArray)
-                with suppress(Exception):
-                    if self.uid in uids or self.uid == msg.extensions.replyMessage.uid:
-                        self.loop.create_task(
-                            ON_MENTION(
-                                self.get_context(self.client, msg, self.ws)))
-
-            for handler in HANDLERS_EVENTS:
-                if msg.type in handler.message_types and msg.mediaType in handler.media_types:
-                    context = self.get_context(self.client, msg, self.ws)
-                    self.loop.create_task(handler.callback(context))
-
-            if msg.content is not None:
-                command = msg.content.lower()
-
-                for handler in HANDLERS_COMMANDS:
-                    is_command_list = [
-                        command.startswith(c) for c in handler.commands
-                    ]
-                    if any(is_command_list):
-                        context = self.get_context(self.client, msg, self.ws)
-                        if '-h' in msg.content:
-                            await context.reply(handler.description)
-                            continue
-
-                        args = [context]
-                        current_command = handler.commands[
-                            is_command_list.index(True)]
-                        content = msg.content[len(current_command):]
-                        words = content.split()
-                        try:
-                            args += get_annotations(handler, words,
-                                                    current_command, content)
-                        except ValueError as error:
-                            log.error(
-                                repr(error) +
-                                f"\nfunction: {handler.callback.__name__}")
-                            continue
-                        except ArgumentsNotFound as error:
-                            log.info(error)
-                            continue
-                        if msg.type in handler.media_types and msg.mediaType in handler.media_types:
-                            try:
-                                self.loop.create_task(handler.callback(*args))
-                            except TypeError as e:
-                                log.error(e)
-                        break
+        o = data['o']
+        raw = o['chatMessage']
+        message_type = raw.get('type')
+        media_type = raw.get('mediaType')
+        content = raw.get('content')
+        view = View(Message, raw, ndcId=o.get('ndcId'))
+        message: Optional[Message] = None
+        compact: Optional[CompactMessage] = None
+        coros = []
+
+        def get_message(
+            handler: Optional[Handler] = None
+        ) -> Union[Message, View, CompactMessage]:
+            nonlocal message, compact
+            if handler is not None and handler.compact:
+                if compact is None:
+                    compact = CompactMessage(raw, o.get('ndcId'))
+                return compact
+            if handler is not None and handler.lazy:
+                return view
+            if message is None:
+                message = view.materialize()
+            return message
+
+        if ON_MENTION is not None:
+            mentioned = False
+            with suppress(Exception):
+                extensions = raw.get('extensions') or {}
+                mentioned = any(
+                    mention.get('uid') == self.uid
+                    for mention in extensions.get('mentionedArray') or ())
+                reply = extensions.get('replyMessage') or {}
+                mentioned = mentioned or reply.get('uid') == self.uid
+            if mentioned:
+                coros.append(
+                    ON_MENTION(
+                        self.get_context(self.client, get_message(), self.ws)))
+
+        for handler in HANDLERS_EVENTS:
+            if message_type in handler.message_types and media_type in handler.media_types:
+                context = self.get_context(self.client, get_message(handler),
+                                           self.ws)
+                coros.append(handler.callback(context))
+
+        if content is not None:
+            command = content.lower()
+
+            for handler, current_command in COMMANDS_ROUTER.match(command):
+                context = self.get_context(self.client, get_message(handler),
+                                           self.ws)
+                if '-h' in content:
+                    await context.reply(handler.description)
+                    continue
+
+                args = [context]
+                try:
+                    args += handler.arguments.parse(
+                        content[len(current_command):])
+                except ValueError as error:
+                    log.error(
+                        repr(error) +
+                        f"\nfunction: {handler.callback.__name__}")
+                    continue
+                except ArgumentsNotFound as error:
+                    log.info(error)
+                    continue
+                if message_type in handler.media_types and media_type in handler.media_types:
+                    try:
+                        coros.append(handler.callback(*args))
+                    except TypeError as e:
+                        log.error(e)
+                break
+
+        if coros:
+            for result in await gather(*coros, return_exceptions=True):
+                if isinstance(result, Exception):
+                    log.error(repr(result), exc_info=result)
+
+    async def on_reconnect(self) -> None:
+        if ON_READY:
+            await ON_READY()
 
     async def __call(self) -> None:
-        timestamp: int = int(time())
-        self.ws = await self.client.ws_connect()
+        self.ws = Connection(self.client, on_switch=self.on_reconnect)
+        await self.ws.start()
+        self.dispatcher.start()
+        self.session_task = self.loop.create_task(self.keep_session())
 
         if ON_READY:
             await ON_READY()
@@ -283,25 +403,16 @@ class Bot:
                 self.loop.create_task(run_while_task(callback))
 
         while True:
+            data = await self.ws.receive()
             try:
-                if int(time()) - timestamp >= 180:
-                    self.ws = await self.client.ws_connect()
-                    timestamp = int(time())
-                    if ON_READY:
-                        await ON_READY()
-
-                    if time() - self.timestamp > 60 * 60 * 12:
-                        login = await self.client.login(
-                            self.email, self.password)
-                        self.sid = login.sid
-                        self.uid = login.auid
-                        self.update_cfg()
-
-                data = await self.ws.receive_json(loads=loads)
-                await self.__call__handlers(data)
-
-            except (TypeError, KeyError, AttributeError,
-                    WebSocketConnectError):
+                if self.waiters:
+                    self.waiters.notify(data)
+                if data.get('t') == 1000:
+                    if self.cache is not None:
+                        self.invalidate_cache(data)
+                    await self.dispatcher.put(data)
+
+            except (TypeError, KeyError, AttributeError):
                 continue
 
     def start(self,
@@ -313,7 +424,14 @@ class Bot:
         self.check_cfg()
         self.loop = loop if loop is not None else get_event_loop()
 
-        self.client = Client(device_id=device_id, proxy=self.proxy)
+        self.client = Client(device_id=device_id,
+                             proxy=self.proxy,
+                             config=self.session_config,
+                             retry=self.retry,
+                             limiter=self.limiter,
+                             cache=self.cache,
+                             media_cache=self.media_cache,
+                             mode=self.mode)
 
         try:
             if check_updates:
@@ -332,10 +450,12 @@ class Bot:
                         f'Please update to the latest version: {version}. Current version: {__version__}'
                     )
 
+            # on_ready gets a validated profile whatever the mode is.
+            client = self.client.with_mode(Mode.MODEL)
             profile: UserProfile
             if self.sid is None:
                 login = self.loop.run_until_complete(
-                    self.client.login(self.email, self.password))
+                    client.login(self.email, self.password))
                 self.sid = login.sid
                 self.uid = login.auid
                 log.info("Update config.")
@@ -343,7 +463,7 @@ class Bot:
                 profile = login.userProfile
             else:
                 profile = self.loop.run_until_complete(
-                    self.client.get_user_info(self.uid))
+                    client.get_user_info(self.uid))
 
             self.client.sid = self.sid
             self.client.uid = self.uid
@@ -355,6 +475,13 @@ class Bot:
         except KeyboardInterrupt:
             log.info("Goodbye. ^^")
         finally:
+            if self.session_task is not None:
+                self.session_task.cancel()
+                self.loop.run_until_complete(
+                    gather(self.session_task, return_exceptions=True))
+            if self.ws is not None:
+                self.loop.run_until_complete(self.ws.stop())
+            self.loop.run_until_complete(self.dispatcher.stop())
             self.loop.run_until_complete(self.client.session.close())
 
     @staticmethod
@@ -367,16 +494,29 @@ class Bot:
         return callback
 
     async def wait_for(self,
-                       check: Callable[[SocketAnswer], bool],
-                       timeout: Optional[float] = None) -> SocketAnswer:
-        while True:
-            index = len(self.futures)
-            try:
-                future = self.loop.create_future()
-                self.futures.append(future)
-                msg = await wait_for(future, timeout=timeout)
-                if check(msg):
-                    return msg
-            except TimeoutError:
-                del self.futures[index]
-                raise TimeoutError("Message not found.")
+                       check: Optional[Callable[[SocketAnswer], bool]] = None,
+                       timeout: Optional[float] = None,
+                       t: Optional[int] = None,
+                       chat_id: Optional[str] = None,
+                       uid: Optional[str] = None,
+                       channel_key: Optional[str] = None) -> SocketAnswer:
+        """
+        Waits for the first frame that matches the hints and passes the check.
+        The hints are checked on the raw frame, so a frame only wakes the
+        waiters it can match.
+
+        Called from a handler, it frees the handler's chat and worker while
+        it waits, so the next messages of the chat are handled meanwhile.
+        """
+        waiter = self.waiters.add(check,
+                                  t=t,
+                                  chat_id=chat_id,
+                                  uid=uid,
+                                  channel_key=channel_key)
+        self.dispatcher.release()
+        try:
+            return await wait_for(waiter.future, timeout=timeout)
+        except TimeoutError:
+            raise TimeoutError("Message not found.")
+        finally:
+            self.waiters.discard(waiter)
@@ -0,0 +1,35 @@
+from asyncio import gather
+from typing import (Awaitable, Callable, Dict, Hashable, Iterable, List,
+                    TypeVar, Union)
+
+__all__ = ['fetch_all']
+
+K = TypeVar('K', bound=Hashable)
+T = TypeVar('T')
+
+
+async def fetch_all(fetch: Callable[[K], Awaitable[T]],
+                    keys: Iterable[K],
+                    concurrency: int = 10) -> List[Union[T, Exception]]:
+    """
+    Results of ``fetch`` for every key in the same order, an error in place
+    of the result when it failed. Every key is fetched once and at most
+    ``concurrency`` fetches run at a time.
+    """
+    if concurrency < 1:
+        raise ValueError("The concurrency must be positive.")
+
+    keys = list(keys)
+    unique = list(dict.fromkeys(keys))
+    results: Dict[K, Union[T, Exception]] = {}
+    queue = iter(unique)
+
+    async def worker() -> None:
+        for key in queue:
+            try:
+                results[key] = await fetch(key)
+            except Exception as error:
+                results[key] = error
+
+    await gather(*(worker() for _ in range(min(concurrency, len(unique)))))
+    return [results[key] for key in keys]
@@ -0,0 +1,90 @@
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Hashable, Optional, Tuple
+
+__all__ = ['ResponseCache']
+
+Key = Tuple[str, str, Hashable]
+
+# Endpoints of cached objects, a write to one of their urls drops the object.
+OBJECTS = ('user-profile', 'chat/thread', 'blog', 'item')
+
+
+def get_object(path: str) -> Optional[Tuple[str, str]]:
+    endpoint, _, object_id = path.partition('?')[0].rpartition('/')
+    if endpoint in OBJECTS and object_id:
+        return endpoint, object_id
+    return None
+
+
+class ResponseCache:
+    """
+    Parsed responses of lookups keyed by (ndc_id, endpoint, id).
+
+    Entries live for ``ttl`` seconds, the least recently used one is evicted
+    when there are more than ``size``. Cached objects are shared between
+    callers, so they should not be changed.
+    """
+
+    __slots__ = ('ttl', 'size', 'entries', 'hits', 'misses', 'evictions',
+                 'invalidations')
+
+    def __init__(self, ttl: float = 60, size: int = 1024) -> None:
+        self.ttl = ttl
+        self.size = size
+        self.entries: 'OrderedDict[Key, Tuple[float, Any]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key: Key) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires, value = entry
+        if expires <= monotonic():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: Key, value: Any) -> Any:
+        self.entries[key] = (monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def invalidate(self,
+                   endpoint: str,
+                   object_id: Hashable,
+                   ndc_id: Optional[str] = None) -> None:
+        """
+        Drops an object, from every community if ``ndc_id`` is None.
+        """
+        if ndc_id is not None:
+            keys = [(ndc_id, endpoint, object_id)]
+        else:
+            keys = [
+                key for key in self.entries
+                if key[1] == endpoint and key[2] == object_id
+            ]
+        for key in keys:
+            if self.entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        self.entries.clear()
@@ -1,31 +1,58 @@
+from asyncio import (Task, TimeoutError, CancelledError, FIRST_COMPLETED,
+                     ensure_future, gather, get_event_loop, wait, wait_for)
 from contextlib import suppress
-from copy import copy
-
-from edamino import objects, api
-from ujson import dumps, loads
-from aiohttp import (ClientSession, ClientWebSocketResponse,
-                     WSServerHandshakeError, ContentTypeError)
-from typing import (Optional, Dict, Tuple, List, Literal, Any, Union)
-from time import time, timezone
-from base64 import b64encode
+from copy import copy, deepcopy
+from functools import partial
+
+from edamino import objects, api, codec
+from edamino.connection import Connection, Endpoints
+from edamino.retry import RetryPolicy, get_retry_after
+from edamino.limiter import RateLimiter, Bucket
+from edamino.cache import ResponseCache, get_object
+from edamino.flights import SingleFlight
+from edamino.pagination import paginate, TokenPages
+from edamino.bulk import fetch_all
+from edamino.download import Download, CHUNK_SIZE
+from edamino.media import MediaCache
+from edamino.views import Mode, Model, get_builder
+from aiohttp import (ClientSession, ClientWebSocketResponse, ClientError,
+                     WSServerHandshakeError)
+from typing import (Optional, Dict, Tuple, List, Literal, Any, Union, Set,
+                    AsyncIterator, Iterable, Callable, Type)
+from time import time, timezone, monotonic
 from binascii import hexlify
 from os import urandom
+from os.path import getsize
 from uuid import UUID
 
 __all__ = ['Client']
 
+WS_ENDPOINTS = Endpoints([f"wss://ws{i}.narvii.com" for i in range(4, 0, -1)])
+FLIGHTS = SingleFlight()
+
 
 def get_timestamp() -> int:
     return int(time() * 1000)
 
 
 class Client:
-    __slots__ = ('ndc_id', 'session', 'headers', 'proxy')
+    __slots__ = ('ndc_id', 'session', 'headers', 'proxy', 'prefix',
+                 'templates', 'retry', 'limiter', 'cache', 'flights',
+                 'media_cache', 'builder', 'builder_mode')
 
     ndc_id: str
+    prefix: str
     proxy: Optional[str]
     session: ClientSession
+    retry: RetryPolicy
+    limiter: Optional[RateLimiter]
+    cache: Optional[ResponseCache]
+    flights: SingleFlight
+    media_cache: Optional[MediaCache]
+    builder: Callable[[Type[Model], Dict], Any]
+    builder_mode: str
     headers: Dict[str, str]
+    templates: Dict[str, Tuple[Dict[str, str], Dict[str, str]]]
 
     @property
     def sid(self) -> str:
@@ -33,7 +60,7 @@ class Client:
 
     @sid.setter
     def sid(self, sid: str) -> None:
-        self.headers["NDCAUTH"] = f"sid={sid}"
+        self.headers = {**self.headers, "NDCAUTH": f"sid={sid}"}
 
     @property
     def uid(self) -> str:
@@ -41,7 +68,7 @@ class Client:
 
     @uid.setter
     def uid(self, uid: str) -> None:
-        self.headers["AUID"] = uid
+        self.headers = {**self.headers, "AUID": uid}
 
     @property
     def device_id(self) -> str:
@@ -49,23 +76,47 @@ class Client:
 
     @device_id.setter
     def device_id(self, device_id: str) -> None:
-        self.headers["NDCDEVICEID"] = device_id
+        self.headers = {**self.headers, "NDCDEVICEID": device_id}
 
     def __init__(self,
                  device_id: Optional[str] = None,
                  com_id: int = 0,
                  proxy: Optional[str] = None,
-                 session: Optional[ClientSession] = None) -> None:
+                 session: Optional[ClientSession] = None,
+                 headers: Optional[Dict[str, str]] = None,
+                 config: Optional[api.SessionConfig] = None,
+                 retry: Optional[RetryPolicy] = None,
+                 limiter: Optional[RateLimiter] = None,
+                 cache: Optional[ResponseCache] = None,
+                 media_cache: Optional[MediaCache] = None,
+                 mode: str = Mode.MODEL) -> None:
+        # The headers dict is a snapshot shared between clients, it is never
+        # changed in place. The setters above replace it with a new one.
         self.proxy = proxy
+        self.retry = retry if retry is not None else RetryPolicy()
+        self.limiter = limiter
+        self.cache = cache
+        self.flights = FLIGHTS
+        self.media_cache = media_cache
+        self.mode = mode
+        self.templates = {}
         self.set_ndc(com_id)
-        self.headers = {
-            "Content-Type": api.ContentType.APPLICATION_JSON,
-            "User-Agent": "Apple iPhone14,2 iOS v16.2 Main/3.13.1",
-            "NDCDEVICEID":
-            device_id if device_id is not None else api.DEVICE_ID
-        }
-        self.session = session if session is not None else ClientSession(
-            json_serialize=dumps)
+        if headers is not None:
+            self.headers = headers
+        else:
+            self.headers = {
+                "Content-Type":
+                api.ContentType.APPLICATION_JSON,
+                "User-Agent":
+                "Apple iPhone14,2 iOS v16.2 Main/3.13.1",
+                "NDCDEVICEID":
+                device_id if device_id is not None else api.DEVICE_ID
+            }
+        if session is None:
+            if config is None:
+                config = api.SessionConfig()
+            session = config.create_session()
+        self.session = session
 
     async def __aexit__(self, *args) -> None:
         await self.session.close()
@@ -77,11 +128,86 @@ class Client:
         self.sid = sid
         self.uid = uid
 
+    def with_ndc(self, com_id: int) -> 'Client':
+        """
+        Client of another community sharing the session, headers, retry
+        policy, rate limiter, caches and mode.
+        """
+        return Client(com_id=com_id,
+                      proxy=self.proxy,
+                      session=self.session,
+                      headers=self.headers,
+                      retry=self.retry,
+                      limiter=self.limiter,
+                      cache=self.cache,
+                      media_cache=self.media_cache,
+                      mode=self.builder_mode)
+
     def set_ndc(self, com_id: int) -> None:
         if com_id != 0:
             self.ndc_id = f"x{com_id}"
         else:
             self.ndc_id = "g"
+        self.prefix = f"https://service.narvii.com/api/v1/{self.ndc_id}/s/"
+
+    def get_headers(self, content_type: str) -> Dict[str, str]:
+        """
+        Headers with another Content-Type, built once per headers snapshot.
+        """
+        headers = self.headers
+        template = self.templates.get(content_type)
+        if template is None or template[0] is not headers:
+            template = self.templates[content_type] = (headers, {
+                **headers, 'Content-Type':
+                content_type
+            })
+        return template[1]
+
+    @property
+    def mode(self) -> str:
+        return self.builder_mode
+
+    @mode.setter
+    def mode(self, mode: str) -> None:
+        self.builder = get_builder(mode)
+        self.builder_mode = mode
+
+    def with_mode(self, mode: str) -> 'Client':
+        """
+        The same client returning responses in another mode, e.g.
+        ``await client.with_mode(Mode.RAW).get_all_users()``.
+        """
+        client = copy(self)
+        client.mode = mode
+        return client
+
+    def build(self, model: Type[Model], data: Dict) -> Any:
+        return self.builder(model, data)
+
+    def build_all(self, model: Type[Model],
+                  items: Iterable[Dict]) -> Tuple[Any, ...]:
+        builder = self.builder
+        return tuple([builder(model, item) for item in items])
+
+    def get_cached(self, endpoint: str, object_id: Any,
+                   model: Type[Model]) -> Optional[Any]:
+        if self.cache is None:
+            return None
+        entry = self.cache.get((self.ndc_id, endpoint, object_id))
+        if entry is None:
+            return None
+        # Clients in other modes share the cache, they build their own
+        # object from the response.
+        mode, value, data = entry
+        return value if mode == self.builder_mode else self.build(model, data)
+
+    def set_cached(self, endpoint: str, object_id: Any, model: Type[Model],
+                   data: Dict) -> Any:
+        value = self.build(model, data)
+        if self.cache is not None:
+            self.cache.put((self.ndc_id, endpoint, object_id),
+                           (self.builder_mode, value, data))
+        return value
 
     async def request(self,
                       method: Literal['POST', 'GET', 'DELETE', 'PUT'],
@@ -89,38 +215,75 @@ class Client:
                       json: Optional[Dict] = None,
                       full_url: bool = False,
                       data: Optional[Union[str, bytes]] = None,
-                      content_type: Optional[str] = None) -> Dict:
+                      content_type: Optional[str] = None,
+                      media: Optional[bytes] = None,
+                      offload: bool = False) -> Dict:
         """
         Sending requests in amino.
+
+        ``media`` is added to ``json`` in base64 as mediaUploadValue. Large
+        media or ``offload`` move the encoding and signing to a thread.
         """
 
-        headers = copy(self.headers)
+        # The headers are never changed in place, so they are only copied
+        # when the request needs a signature.
+        if content_type is not None:
+            headers = self.get_headers(content_type)
+        else:
+            headers = self.headers
 
+        bucket = None
         if not full_url:
-            url = f"https://service.narvii.com/api/v1/{self.ndc_id}/s/{url}"
+            if self.limiter is not None:
+                bucket = self.limiter.get_bucket(method, url)
+            if self.cache is not None and method != 'GET':
+                changed = get_object(url)
+                if changed is not None:
+                    self.cache.invalidate(*changed, self.ndc_id)
+            url = self.prefix + url
         if json is not None:
             json['timestamp'] = get_timestamp()
-            data = dumps(json)
-            headers['NDC-MSG-SIG'] = api.generate_signature(data)
-
-        if content_type is not None:
-            headers = copy(self.headers)
-            headers['Content-Type'] = content_type
-
+            if offload or (media is not None
+                           and len(media) >= api.OFFLOAD_SIZE):
+                data, signature = await get_event_loop().run_in_executor(
+                    None, api.encode_json, json, media)
+            else:
+                data, signature = api.encode_json(json, media)
+            headers = {**headers, 'NDC-MSG-SIG': signature}
+
+        call = partial(self.retry.call, method, url,
+                       partial(self.send, method, url, headers, data, bucket))
+        if method == 'GET' and data is None:
+            # Identical reads in flight share one request, the callers that
+            # join it get their own copy of the response.
+            key = (url, headers.get('NDCAUTH'), id(self.session), self.proxy)
+            return await self.flights.run(key, call, deepcopy)
+        return await call()
+
+    async def send(self,
+                   method: str,
+                   url: str,
+                   headers: Dict[str, str],
+                   data: Optional[Union[str, bytes]],
+                   bucket: Optional[Bucket] = None) -> Dict:
+        if bucket is not None:
+            await bucket.acquire()
         async with self.session.request(method=method,
                                         url=url,
                                         headers=headers,
                                         data=data,
                                         proxy=self.proxy) as resp:
-            try:
-                response: Dict = await resp.json(loads=loads)
-            except ContentTypeError:
-                text = await resp.text()
-                raise api.HtmlError(text)
+            body = await resp.read()
+            if 'json' not in resp.content_type:
+                raise api.HtmlError(body.decode('utf-8', errors='replace'),
+                                    resp.status, get_retry_after(resp.headers))
+            response: Dict = codec.loads(body)
 
         if resp.status != 200:
             raise api.InvalidRequest(response['api:message'],
-                                     response['api:statuscode'], response)
+                                     response['api:statuscode'],
+                                     response, resp.status,
+                                     get_retry_after(resp.headers))
 
         return response
 
@@ -134,11 +297,10 @@ class Client:
             "action": "normal"
         }
 
-        login = objects.Login(
-            **await self.request('POST', 'auth/login', json=data))
-        self.sid = login.sid
-        self.uid = login.auid
-        return login
+        response = await self.request('POST', 'auth/login', json=data)
+        self.sid = response['sid']
+        self.uid = response['auid']
+        return self.build(objects.Login, response)
 
     async def get_my_communities(
             self,
@@ -146,18 +308,34 @@ class Client:
             size: int = 25) -> Tuple[objects.Community, ...]:
         response = await self.request(
             'GET', f'community/joined?v=1&start={start}&size={size}')
-        return tuple(
-            map(lambda community: objects.Community(**community),
-                response['communityList']))
+        return self.build_all(objects.Community, response['communityList'])
+
+    def get_my_communities_iter(
+            self,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.Community]:
+        return paginate(self.get_my_communities, start, size, prefetch, limit)
 
     async def get_info_link(self, link: str) -> objects.LinkInfoExtensions:
-        base = objects.BaseLinkInfo(
-            **await self.request('GET', f'link-resolution?q={link}'))
-        return base.linkInfoV2.extensions
+        response = await self.request('GET', f'link-resolution?q={link}')
+        return self.build(objects.LinkInfoExtensions,
+                          response['linkInfoV2']['extensions'])
 
     async def get_user_info(self, user_id: str) -> objects.UserProfile:
+        user = self.get_cached('user-profile', user_id, objects.UserProfile)
+        if user is not None:
+            return user
         response = await self.request('GET', f'user-profile/{user_id}')
-        return objects.UserProfile(**response['userProfile'])
+        return self.set_cached('user-profile', user_id, objects.UserProfile,
+                               response['userProfile'])
+
+    async def get_users_info(self,
+                             user_ids: Iterable[str],
+                             concurrency: int = 10
+                             ) -> List[Union[objects.UserProfile, Exception]]:
+        return await fetch_all(self.get_user_info, user_ids, concurrency)
 
     async def get_link_identify(self, code: str) -> Dict:
         return await self.request(
@@ -176,58 +354,99 @@ class Client:
     async def leave_community(self):
         return await self.request('POST', 'community/leave')
 
-    async def upload_media(self, data: bytes, content_type: str) -> str:
+    async def upload(self, target: str, data: bytes, content_type: str) -> str:
+        """
+        Uploads a file once per media cache entry and returns its media value.
+        """
+        if self.media_cache is not None:
+            key = await self.media_cache.get_key(target, content_type, data)
+            media_value = self.media_cache.get(key)
+            if media_value is not None:
+                return media_value
+
         response = await self.request('POST',
-                                      "media/upload",
+                                      target,
                                       data=data,
                                       content_type=content_type)
-        return response['mediaValue']
-
-    async def download_from_link(self, link: str) -> bytes:
-        async with self.session.get(link) as response:
-            f = await response.read()
+        media_value = response['mediaValue']
+        if self.media_cache is not None:
+            await self.media_cache.put(key, media_value)
+        return media_value
 
-        if response.status != 200:
-            js_resp: Dict = loads(await response.text())
-            raise api.InvalidRequest(js_resp['api:message'],
-                                     js_resp['api:statuscode'], js_resp)
+    async def upload_media(self, data: bytes, content_type: str) -> str:
+        return await self.upload("media/upload", data, content_type)
 
-        return f
+    def download(self,
+                 link: str,
+                 chunk_size: int = CHUNK_SIZE,
+                 max_size: Optional[int] = None,
+                 offset: int = 0) -> Download:
+        """
+        Streamed download, iterate it for the chunks of the body.
+        """
+        return Download(self.session, link, chunk_size, max_size, offset)
+
+    async def download_from_link(self,
+                                 link: str,
+                                 max_size: Optional[int] = None) -> bytes:
+        return await self.download(link, max_size=max_size).read()
+
+    async def download_to_file(self,
+                               link: str,
+                               path: str,
+                               max_size: Optional[int] = None,
+                               resume: bool = False,
+                               chunk_size: int = CHUNK_SIZE) -> Download:
+        """
+        Saves a link to a file without holding it in memory. With ``resume``
+        only the part that is missing from the file is downloaded.
+        """
+        offset = 0
+        if resume:
+            with suppress(FileNotFoundError):
+                offset = getsize(path)
+        download = self.download(link, chunk_size, max_size, offset)
+        await download.save(path)
+        return download
 
     async def send_image(self, image: bytes, chat_id: str) -> Dict:
         data = {
             "content": None,
             "mediaType": api.MediaType.GIF_AND_IMAGE,
             "mediaUploadValueContentType": "image/jpg",
-            "mediaUhqEnabled": True,
-            "mediaUploadValue": b64encode(image).decode()
+            "mediaUhqEnabled": True
         }
+        if self.media_cache is not None:
+            # Sent by the media value of a single upload of the image.
+            data["mediaValue"] = await self.upload_media(image, "image/jpg")
+            image = None
         return await self.request("POST",
                                   f"chat/thread/{chat_id}/message",
-                                  json=data)
+                                  json=data,
+                                  media=image)
 
     async def send_audio(self, audio: bytes, chat_id: str) -> Dict:
-        data = {
-            "content": None,
-            "type": 2,
-            "mediaType": api.MediaType.AUDIO,
-            "mediaUploadValue": b64encode(audio).decode()
-        }
+        data = {"content": None, "type": 2, "mediaType": api.MediaType.AUDIO}
         return await self.request("POST",
                                   f"chat/thread/{chat_id}/message",
-                                  json=data)
+                                  json=data,
+                                  media=audio)
 
     async def send_gif(self, image: bytes, chat_id: str) -> Dict:
         data = {
             "content": None,
             "mediaType": api.MediaType.GIF_AND_IMAGE,
             "mediaUploadValueContentType": "image/gif",
-            "mediaUhqEnabled": True,
-            "mediaUploadValue": b64encode(image).decode()
+            "mediaUhqEnabled": True
         }
+        if self.media_cache is not None:
+            # Sent by the media value of a single upload of the image.
+            data["mediaValue"] = await self.upload_media(image, "image/gif")
+            image = None
         return await self.request("POST",
                                   f"chat/thread/{chat_id}/message",
-                                  json=data)
+                                  json=data,
+                                  media=image)
 
     async def send_message(
         self,
@@ -252,10 +471,17 @@ class Client:
         if message is not None:
             message = message.replace("<$", "‎‏").replace("$>", "‬‭")
 
+        offload = False
         if link_snippets_list:
-            link_snippets_list = [
-                snippet.dict() for snippet in link_snippets_list
-            ]
+            snippets = map(api.LinkSnippet.dict, link_snippets_list)
+            offload = sum(
+                len(snippet.media)
+                for snippet in link_snippets_list) >= api.OFFLOAD_SIZE
+            if offload:
+                link_snippets_list = await get_event_loop().run_in_executor(
+                    None, list, snippets)
+            else:
+                link_snippets_list = list(snippets)
 
         data = {
             "type": message_type,
@@ -272,18 +498,29 @@ class Client:
 
         response = await self.request("POST",
                                       f"chat/thread/{chat_id}/message",
-                                      json=data)
-        return objects.Message(**response['message'])
+                                      json=data,
+                                      offload=offload)
+        return self.build(objects.Message, response['message'])
 
     async def get_chats(self,
                         start: int = 0,
                         size: int = 100) -> Tuple[objects.Chat, ...]:
         response = await self.request(
             'GET', f'chat/thread?type=joined-me&start={start}&size={size}')
-        return tuple(
-            map(lambda chat: objects.Chat(**chat), response['threadList']))
+        return self.build_all(objects.Chat, response['threadList'])
+
+    async def ws_connect(self,
+                         endpoints: Optional[Endpoints] = None,
+                         stagger: float = 0.25,
+                         timeout: float = 10) -> ClientWebSocketResponse:
+        """
+        Races the websocket endpoints, starting the next one every
+        ``stagger`` seconds or as soon as the previous one fails, and keeps
+        the first that connects.
+        """
+        if endpoints is None:
+            endpoints = WS_ENDPOINTS
 
-    async def ws_connect(self) -> ClientWebSocketResponse:
         timestamp = get_timestamp()
         url = f"{self.device_id}|{timestamp}"
         headers = {
@@ -291,32 +528,73 @@ class Client:
             "NDCDEVICEID": self.device_id,
             "NDC-MSG-SIG": api.generate_signature(url)
         }
-        for i in range(4, 0, -1):
+
+        async def attempt(endpoint: str) -> ClientWebSocketResponse:
+            started = monotonic()
             try:
-                return await self.session.ws_connect(
-                    f"wss://ws{i}.narvii.com/?signbody={self.device_id}%7C{timestamp}",
+                ws = await wait_for(self.session.ws_connect(
+                    f"{endpoint}/?signbody={self.device_id}%7C{timestamp}",
                     headers=headers,
-                    proxy=self.proxy)
-            except WSServerHandshakeError:
-                continue
-
-        raise api.WebSocketConnectError("Failed to connect to remote server.")
+                    proxy=self.proxy),
+                                    timeout=timeout)
+            except (WSServerHandshakeError, ClientError, OSError,
+                    TimeoutError):
+                endpoints.failure(endpoint)
+                raise
+            except CancelledError:
+                endpoints.cancelled(endpoint, monotonic() - started)
+                raise
+            endpoints.success(endpoint, monotonic() - started)
+            return ws
+
+        queue = endpoints.ordered()
+        pending: Set[Task] = set()
+        winner: Optional[ClientWebSocketResponse] = None
+        try:
+            while winner is None and (queue or pending):
+                if queue:
+                    pending.add(ensure_future(attempt(queue.pop(0))))
+                done, pending = await wait(pending,
+                                           timeout=stagger if queue else None,
+                                           return_when=FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        continue
+                    if winner is None:
+                        winner = task.result()
+                    else:
+                        await task.result().close()
+        finally:
+            for task in pending:
+                task.cancel()
+            # A cancellation of the caller still goes through here.
+            results = await gather(*pending, return_exceptions=True)
+            for ws in results:
+                if isinstance(ws, ClientWebSocketResponse):
+                    await ws.close()
+
+        if winner is None:
+            raise api.WebSocketConnectError(
+                "Failed to connect to remote server.")
+        return winner
 
     async def receive_ws_message(self):
-        timestamp = int(time())
-        ws = await self.ws_connect()
-
-        while True:
-            with suppress(TypeError):
-                if time() - timestamp >= 180:
-                    ws = await self.ws_connect()
-                    timestamp = int(time())
-
-                yield await ws.receive_json(loads=loads)
+        connection = Connection(self)
+        await connection.start()
+        try:
+            while True:
+                yield await connection.receive()
+        finally:
+            await connection.stop()
 
     async def get_from_id(self,
                           object_id: str,
                           object_type: int = 0) -> objects.LinkInfo:
+        link = self.get_cached('link-resolution', (object_id, object_type),
+                               objects.LinkInfo)
+        if link is not None:
+            return link
+
         data = {
             "objectId": object_id,
             "targetCode": 1,
@@ -328,41 +606,75 @@ class Client:
         else:
             url = f'https://service.narvii.com/api/v1/g/s-{self.ndc_id}/link-resolution'
 
-        base = objects.BaseLinkInfo(
-            **await self.request('POST', url, data, True))
-        return base.linkInfoV2.extensions.linkInfo
+        response = await self.request('POST', url, data, True)
+        return self.set_cached(
+            'link-resolution', (object_id, object_type), objects.LinkInfo,
+            response['linkInfoV2']['extensions']['linkInfo'])
 
     async def get_chat_info(self, chat_id) -> objects.Chat:
+        chat = self.get_cached('chat/thread', chat_id, objects.Chat)
+        if chat is not None:
+            return chat
         response = await self.request('GET', f'chat/thread/{chat_id}')
-        return objects.Chat(**response['thread'])
+        return self.set_cached('chat/thread', chat_id, objects.Chat,
+                               response['thread'])
 
-    async def get_chat_messages(
+    async def get_chats_info(
             self,
-            chat_id: str,
-            size: int = 25,
-            page_token: Optional[str] = None) -> objects.Messages:
+            chat_ids: Iterable[str],
+            concurrency: int = 10) -> List[Union[objects.Chat, Exception]]:
+        return await fetch_all(self.get_chat_info, chat_ids, concurrency)
+
+    async def request_chat_messages(self, chat_id: str, size: int,
+                                    page_token: Optional[str]) -> Dict:
         url = f'chat/thread/{chat_id}/message?v=2&pagingType=t&size={size}'
         if page_token is not None:
             url += f"&pageToken={page_token}"
-        response = await self.request('GET', url)
-
-        return objects.Messages(**response)
+        return await self.request('GET', url)
 
-    async def get_chat_messages_iter(self, chat_id: str, size: int = 100):
-        ost: int = size % 100
-        whole: int = size // 100
-        page_token: Optional[str] = None
-        for i in range(whole):
-            messages = await self.get_chat_messages(chat_id,
-                                                    size=100,
-                                                    page_token=page_token)
+    async def get_chat_messages(
+            self,
+            chat_id: str,
+            size: int = 25,
+            page_token: Optional[str] = None) -> objects.Messages:
+        response = await self.request_chat_messages(chat_id, size, page_token)
+        return self.build(objects.Messages, response)
 
-            page_token = messages.paging.nextPageToken
-            yield messages.messageList
+    def get_chat_messages_iter(
+            self,
+            chat_id: str,
+            size: Optional[int] = 100,
+            page_size: int = 100,
+            page_token: Optional[str] = None,
+            pages: bool = True,
+            until: Optional[str] = None) -> TokenPages[objects.Message]:
+        """
+        Messages of a chat from the newest, ``size`` of them or all of them
+        with None. ``until`` stops at the first message created before that
+        time, e.g. ``'2021-08-01T00:00:00Z'``. Pass ``page_token`` of a
+        previous iterator to resume it.
+        """
 
-        yield (await self.get_chat_messages(chat_id,
-                                            size=ost,
-                                            page_token=page_token)).messageList
+        async def fetch(token: Optional[str], count: int):
+            response = await self.request_chat_messages(chat_id, count, token)
+            messages = response.get('messageList') or ()
+            paging = response.get('paging') or {}
+            return (self.build_all(objects.Message,
+                                   messages), paging.get('nextPageToken'))
+
+        def is_older(message: Any) -> bool:
+            if isinstance(message, dict):
+                created = message.get('createdTime')
+            else:
+                created = message.createdTime
+            return created is not None and created < until
+
+        return TokenPages(fetch,
+                          page_token=page_token,
+                          size=min(page_size, 100),
+                          limit=size,
+                          pages=pages,
+                          stop=is_older if until is not None else None)
 
     async def get_chat_users(
             self,
@@ -373,23 +685,49 @@ class Client:
             'GET',
             f'chat/thread/{chat_id}/member?start={start}&size={size}&type=default&cv=1.2'
         )
-        return tuple(
-            map(lambda user: objects.UserProfile(**user),
-                response['memberList']))
+        return self.build_all(objects.UserProfile, response['memberList'])
+
+    def get_chat_users_iter(
+            self,
+            chat_id: str,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.UserProfile]:
+        return paginate(partial(self.get_chat_users, chat_id), start, size,
+                        prefetch, limit)
 
     async def get_message_info(self, chat_id: str,
                                message_id: str) -> objects.Message:
         response = await self.request(
             'GET', f'chat/thread/{chat_id}/message/{message_id}')
-        return objects.Message(**response['message'])
+        return self.build(objects.Message, response['message'])
 
     async def get_blog_info(self, blog_id: str) -> objects.Blog:
+        blog = self.get_cached('blog', blog_id, objects.Blog)
+        if blog is not None:
+            return blog
         response = await self.request('GET', f'blog/{blog_id}')
-        return objects.Blog(**response['blog'])
+        return self.set_cached('blog', blog_id, objects.Blog, response['blog'])
+
+    async def get_blogs_info(
+            self,
+            blog_ids: Iterable[str],
+            concurrency: int = 10) -> List[Union[objects.Blog, Exception]]:
+        return await fetch_all(self.get_blog_info, blog_ids, concurrency)
 
     async def get_wiki_info(self, wiki_id: str) -> objects.Wiki:
+        wiki = self.get_cached('item', wiki_id, objects.Wiki)
+        if wiki is not None:
+            return wiki
         response = await self.request('GET', f'item/{wiki_id}')
-        return objects.Wiki(**response['item'])
+        return self.set_cached('item', wiki_id, objects.Wiki, response['item'])
+
+    async def get_wikis_info(
+            self,
+            wiki_ids: Iterable[str],
+            concurrency: int = 10) -> List[Union[objects.Wiki, Exception]]:
+        return await fetch_all(self.get_wiki_info, wiki_ids, concurrency)
 
     async def check_in(self, tz: int = -timezone // 1000) -> Dict:
         data = {"timezone": tz}
@@ -543,9 +881,15 @@ class Client:
             "GET",
             f'live-layer?topic=ndtopic:{self.ndc_id}:online-members&start={start}&size={size}'
         )
-        return tuple(
-            map(lambda user: objects.UserProfile(**user),
-                response["userProfileList"]))
+        return self.build_all(objects.UserProfile, response["userProfileList"])
+
+    def get_online_users_iter(
+            self,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.UserProfile]:
+        return paginate(self.get_online_users, start, size, prefetch, limit)
 
     async def get_all_users(self,
                             users_type: Literal['recent', 'banned', 'featured',
@@ -555,9 +899,18 @@ class Client:
                             size: int = 25) -> Tuple[objects.UserProfile, ...]:
         response = await self.request(
             'GET', f'user-profile?type={users_type}&start={start}&size={size}')
-        return tuple(
-            map(lambda user: objects.UserProfile(**user),
-                response['userProfileList']))
+        return self.build_all(objects.UserProfile, response['userProfileList'])
+
+    def get_all_users_iter(
+            self,
+            users_type: Literal['recent', 'banned', 'featured', 'leaders',
+                                'curators'] = "recent",
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.UserProfile]:
+        return paginate(partial(self.get_all_users, users_type), start, size,
+                        prefetch, limit)
 
     async def activity(self):
         pass
@@ -617,7 +970,7 @@ class Client:
 
     async def get_wallet_info(self) -> objects.WalletInfo:
         response = await self.request('GET', 'wallet')
-        return objects.WalletInfo(**response['wallet'])
+        return self.build(objects.WalletInfo, response['wallet'])
 
     async def join_chat(self, chat_id: str) -> Dict:
         return await self.request('POST',
@@ -664,8 +1017,17 @@ class Client:
                              size: int = 25) -> Tuple[objects.Blog]:
         response = await self.request(
             'GET', f'blog?type=user&q={user_id}&start={start}&size={size}')
-        return tuple(
-            map(lambda blog: objects.Blog(**blog), response['blogList']))
+        return self.build_all(objects.Blog, response['blogList'])
+
+    def get_user_blogs_iter(
+            self,
+            user_id: str,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.Blog]:
+        return paginate(partial(self.get_user_blogs, user_id), start, size,
+                        prefetch, limit)
 
     async def pin_announcement_from_chat(
             self,
@@ -723,11 +1085,13 @@ class Client:
                                   background: Optional[bytes] = None):
         data = {
             "mediaType": api.MediaType.GIF_AND_IMAGE,
-            "mediaUploadValue": b64encode(background).decode(),
             "mediaUploadValueContentType": api.ContentType.IMAGE_JPG
         }
         return await self.request(
-            'POST', f'thread/{chat_id}/member/{self.uid}/background', data)
+            'POST',
+            f'thread/{chat_id}/member/{self.uid}/background',
+            data,
+            media=background)
 
     async def set_default_background_chat(self,
                                           chat_id: str,
@@ -752,8 +1116,15 @@ class Client:
         response = await self.request(
             'GET',
             f'chat/chat-bubble?type=all-my-bubbles&start={start}&size={size}')
-        return tuple(
-            map(lambda b: objects.ChatBubble(**b), response["chatBubbleList"]))
+        return self.build_all(objects.ChatBubble, response["chatBubbleList"])
+
+    def get_bubbles_iter(
+            self,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.ChatBubble]:
+        return paginate(self.get_bubbles, start, size, prefetch, limit)
 
     async def delete_bubble(self, bubble_id: str) -> Dict:
         return await self.request('DELETE', f'chat/chat-bubble/{bubble_id}')
@@ -773,8 +1144,7 @@ class Client:
 
     async def get_templates(self):
         response = await self.request('GET', 'chat/chat-bubble/templates')
-        return tuple(
-            map(lambda t: objects.Template(**t), response['templateList']))
+        return self.build_all(objects.Template, response['templateList'])
 
     async def create_bubble(self, template_id: str,
                             config) -> objects.ChatBubble:
@@ -783,7 +1153,7 @@ class Client:
             f'chat/chat-bubble/templates/{template_id}/generate',
             data=config.get_zip(),
             content_type=api.ContentType.APPLICATION_OCTET_STREAM)
-        return objects.ChatBubble(**response['chatBubble'])
+        return self.build(objects.ChatBubble, response['chatBubble'])
 
     async def update_bubble(self, bubble_id: str, config):
         response = await self.request(
@@ -791,15 +1161,11 @@ class Client:
             f'chat/chat-bubble/{bubble_id}',
             data=config.get_zip(),
             content_type=api.ContentType.APPLICATION_OCTET_STREAM)
-        return objects.ChatBubble(**response['chatBubble'])
+        return self.build(objects.ChatBubble, response['chatBubble'])
 
     async def upload_image_bubble(self, image: bytes) -> str:
-        response = await self.request(
-            'POST',
-            'media/upload/target/chat-bubble-thumbnail',
-            data=image,
-            content_type=api.ContentType.IMAGE_PNG)
-        return response['mediaValue']
+        return await self.upload('media/upload/target/chat-bubble-thumbnail',
+                                 image, api.ContentType.IMAGE_PNG)
 
     async def delete_invite_code(self, invite_id: str) -> Dict:
         return await self.request('DELETE',
@@ -852,7 +1218,7 @@ class Client:
             data["taggedBlogCategoryIdList"] = categories_list
 
         response = await self.request('POST', f"blog", data)
-        return objects.Blog(**response['blog'])
+        return self.build(objects.Blog, response['blog'])
 
     async def post_wiki(self,
                         title: str,
@@ -886,7 +1252,7 @@ class Client:
             }
 
         response = await self.request('POST', "item", data)
-        return objects.Wiki(**response)
+        return self.build(objects.Wiki, response)
 
     async def edit_blog(self,
                         blog_id: str,
@@ -943,14 +1309,22 @@ class Client:
         }
 
         response = await self.request('POST', "blog", data)
-        return objects.Blog(**response['blog'])
+        return self.build(objects.Blog, response['blog'])
 
     async def get_public_chats(self,
                                start: int = 0,
                                size: int = 25) -> Tuple[objects.Chat]:
         response = await self.request(
             'GET', f"live-layer/public-chats?start={start}&size={size}")
-        return tuple(map(lambda o: objects.Chat(**o), response["threadList"]))
+        return self.build_all(objects.Chat, response["threadList"])
+
+    def get_public_chats_iter(
+            self,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.Chat]:
+        return paginate(self.get_public_chats, start, size, prefetch, limit)
 
     async def get_user_wikis(self,
                              user_id: str,
@@ -960,7 +1334,17 @@ class Client:
             'GET',
             f"item?type=user-all&start={start}&size={size}&cv=1.2&uid={user_id}"
         )
-        return tuple(map(lambda o: objects.Wiki(**o), response["itemList"]))
+        return self.build_all(objects.Wiki, response["itemList"])
+
+    def get_user_wikis_iter(
+            self,
+            user_id: str,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.Wiki]:
+        return paginate(partial(self.get_user_wikis, user_id), start, size,
+                        prefetch, limit)
 
     async def ban(self,
                   user_id: str,
@@ -1003,7 +1387,7 @@ class Client:
             data["eventSource"] = "GlobalComposeMenu"
 
         response = await self.request("POST", url='chat/thread', json=data)
-        return objects.Chat(**response["thread"])
+        return self.build(objects.Chat, response["thread"])
 
     async def send_sticker(self, chat_id: str,
                            sticker_id: str) -> objects.Message:
@@ -1015,7 +1399,7 @@ class Client:
 
         response = await self.request('POST', f'chat/thread/{chat_id}/message',
                                       data)
-        return objects.Message(**response['message'])
+        return self.build(objects.Message, response['message'])
 
     async def get_user_following(self,
                                  user_id: str,
@@ -1023,9 +1407,17 @@ class Client:
                                  size: int = 25):
         response = await self.request(
             'GET', f'user-profile/{user_id}/joined?start={start}&size={size}')
-        return tuple(
-            map(lambda user: objects.UserProfile(**user),
-                response['userProfileList']))
+        return self.build_all(objects.UserProfile, response['userProfileList'])
+
+    def get_user_following_iter(
+            self,
+            user_id: str,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.UserProfile]:
+        return paginate(partial(self.get_user_following, user_id), start, size,
+                        prefetch, limit)
 
     async def get_user_followers(self,
                                  user_id: str,
@@ -1033,6 +1425,14 @@ class Client:
                                  size: int = 25):
         response = await self.request(
             'GET', f'user-profile/{user_id}/member?start={start}&size={size}')
-        return tuple(
-            map(lambda user: objects.UserProfile(**user),
-                response['userProfileList']))
+        return self.build_all(objects.UserProfile, response['userProfileList'])
+
+    def get_user_followers_iter(
+            self,
+            user_id: str,
+            start: int = 0,
+            size: int = 100,
+            prefetch: int = 2,
+            limit: Optional[int] = None) -> AsyncIterator[objects.UserProfile]:
+        return paginate(partial(self.get_user_followers, user_id), start, size,
+                        prefetch, limit)
@@ -0,0 +1,66 @@
+from typing import Any, Callable, Tuple, Union
+
+__all__ = ['use', 'encode', 'dumps', 'loads', 'CODECS']
+
+CODECS = ('ujson', 'orjson', 'msgspec', 'json')
+
+name: str
+encode: Callable[[Any], bytes]
+dumps: Callable[[Any], str]
+loads: Callable[[Union[str, bytes]], Any]
+
+
+def get_codec(
+    codec: str
+) -> Tuple[Callable[[Any], bytes], Callable[[Any], str], Callable[
+    [Union[str, bytes]], Any]]:
+    if codec == 'ujson':
+        import ujson
+
+        def encode(data: Any) -> bytes:
+            return ujson.dumps(data).encode('utf-8')
+
+        return encode, ujson.dumps, ujson.loads
+
+    if codec == 'orjson':
+        import orjson
+
+        def dumps(data: Any) -> str:
+            return orjson.dumps(data).decode('utf-8')
+
+        return orjson.dumps, dumps, orjson.loads
+
+    if codec == 'msgspec':
+        from msgspec import json as msgspec_json
+
+        def dumps(data: Any) -> str:
+            return msgspec_json.encode(data).decode('utf-8')
+
+        return msgspec_json.encode, dumps, msgspec_json.decode
+
+    if codec == 'json':
+        import json
+
+        def dumps(data: Any) -> str:
+            return json.dumps(data, separators=(',', ':'))
+
+        def encode(data: Any) -> bytes:
+            return dumps(data).encode('utf-8')
+
+        return encode, dumps, json.loads
+
+    raise ValueError(f"Unknown codec: {codec}. Use one of {CODECS}")
+
+
+def use(codec: str) -> None:
+    """
+    Selects the JSON backend of requests, responses and the websocket at
+    startup. ``encode`` returns bytes, so a request body is signed and sent
+    from one buffer. Optional backends have to be installed.
+    """
+    global name, encode, dumps, loads
+    encode, dumps, loads = get_codec(codec)
+    name = codec
+
+
+use('ujson')
@@ -0,0 +1,94 @@
+from sys import intern
+from typing import Any, Dict, Optional, Union
+
+from . import codec
+from .objects import Author, ChatBubble, Extensions, Message
+from .views import View
+
+__all__ = ['CompactMessage']
+
+# Fields kept encoded until one of them is read.
+NESTED = ('author', 'extensions', 'chatBubble')
+
+
+def intern_str(value: Any) -> Any:
+    return intern(value) if type(value) is str else value
+
+
+class CompactMessage:
+    """
+    Message for bots that keep a lot of them, e.g. a window of recent
+    messages.
+
+    uid, threadId and chatBubbleId are interned, so the messages of a chat or
+    a user share them. author, extensions and chatBubble are kept encoded
+    and checked the first time one of them is read. ``materialize`` builds
+    the full ``Message``.
+    """
+
+    __slots__ = ('threadId', 'messageId', 'uid', 'ndcId', 'type', 'mediaType',
+                 'content', 'mediaValue', 'createdTime', 'clientRefId',
+                 'isHidden', 'includedInSummary', 'chatBubbleId',
+                 'chatBubbleVersion', 'nested')
+
+    nested: Union[None, bytes, View]
+
+    def __init__(self, data: Dict, ndc_id: Optional[int] = None) -> None:
+        get = data.get
+        self.threadId = intern_str(get('threadId'))
+        self.messageId = get('messageId')
+        self.uid = intern_str(get('uid'))
+        self.ndcId = ndc_id if ndc_id is not None else get('ndcId')
+        self.type = get('type')
+        self.mediaType = get('mediaType')
+        self.content = get('content')
+        self.mediaValue = get('mediaValue')
+        self.createdTime = get('createdTime')
+        self.clientRefId = get('clientRefId')
+        self.isHidden = get('isHidden')
+        self.includedInSummary = get('includedInSummary')
+        self.chatBubbleId = intern_str(get('chatBubbleId'))
+        self.chatBubbleVersion = get('chatBubbleVersion')
+
+        nested = {name: data[name] for name in NESTED if get(name) is not None}
+        self.nested = codec.encode(nested) if nested else None
+
+    def __repr__(self) -> str:
+        return (f'CompactMessage(threadId={self.threadId!r}, '
+                f'messageId={self.messageId!r}, uid={self.uid!r}, '
+                f'content={self.content!r})')
+
+    def get_nested(self, name: str) -> Any:
+        nested = self.nested
+        if nested is None:
+            return None
+        if type(nested) is bytes:
+            nested = self.nested = View(Message, codec.loads(nested))
+        return getattr(nested, name)
+
+    @property
+    def author(self) -> Optional[Author]:
+        return self.get_nested('author')
+
+    @property
+    def extensions(self) -> Optional[Extensions]:
+        return self.get_nested('extensions')
+
+    @property
+    def chatBubble(self) -> Optional[ChatBubble]:
+        return self.get_nested('chatBubble')
+
+    def materialize(self) -> Message:
+        data = {
+            name: getattr(self, name)
+            for name in self.__slots__ if name != 'nested'
+        }
+        nested = self.nested
+        if type(nested) is bytes:
+            data.update(codec.loads(nested))
+            return Message(**data)
+        message = Message(**data)
+        if nested is not None:
+            for name in NESTED:
+                setattr(message, name, getattr(nested, name))
+        return message
@@ -0,0 +1,212 @@
+from asyncio import (Queue, Event, Task, CancelledError, TimeoutError,
+                     get_event_loop, sleep, wait_for)
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from aiohttp import ClientError, ClientWebSocketResponse, WSMsgType
+
+from . import codec
+from .api import WebSocketConnectError
+from .logger import logger as log
+
+__all__ = ['Connection', 'Endpoints']
+
+CLOSED = (WSMsgType.CLOSE, WSMsgType.CLOSING, WSMsgType.CLOSED,
+          WSMsgType.ERROR)
+
+
+def get_frame_id(data: Dict) -> Optional[str]:
+    try:
+        return data['o']['chatMessage']['messageId']
+    except (KeyError, TypeError):
+        return None
+
+
+class Endpoints:
+    """
+    Websocket endpoints ordered by health.
+
+    Endpoints that failed last go to the back, the rest are ordered by the
+    moving average of their handshake time. Endpoints that were never tried
+    keep their original order.
+    """
+
+    __slots__ = ('urls', 'latency', 'failures', 'alpha')
+
+    def __init__(self, urls: List[str], alpha: float = 0.3) -> None:
+        self.urls = list(urls)
+        self.latency: Dict[str, float] = {}
+        self.failures: Dict[str, int] = {url: 0 for url in self.urls}
+        self.alpha = alpha
+
+    def ordered(self) -> List[str]:
+        fallback = max(self.latency.values(), default=0.0)
+        return sorted(
+            self.urls,
+            key=lambda url:
+            (self.failures[url] > 0, self.latency.get(url, fallback)))
+
+    def success(self, url: str, latency: float) -> None:
+        previous = self.latency.get(url)
+        if previous is not None:
+            latency = previous + self.alpha * (latency - previous)
+        self.latency[url] = latency
+        self.failures[url] = 0
+
+    def failure(self, url: str) -> None:
+        self.failures[url] += 1
+
+    def cancelled(self, url: str, latency: float) -> None:
+        # The handshake lost the race, so it takes at least this long.
+        self.latency[url] = max(self.latency.get(url, 0.0), latency)
+
+
+class Connection:
+    """
+    Websocket that is replaced every ``interval`` seconds without a gap.
+
+    The replacement is opened in the background while the current socket is
+    still read, then the connection switches to it, reads the old one for
+    ``grace`` more seconds and closes it. Chat messages received on both
+    sockets are only delivered once.
+    """
+
+    __slots__ = ('client', 'interval', 'grace', 'retry', 'on_switch', 'ws',
+                 'frames', 'readers', 'retiring', 'task', 'lost', 'recent',
+                 'recent_ids', 'switches', 'duplicates')
+
+    def __init__(self,
+                 client,
+                 interval: float = 180,
+                 grace: float = 5,
+                 retry: float = 5,
+                 on_switch: Optional[Callable[[], Awaitable[None]]] = None,
+                 size: int = 100,
+                 history: int = 1000) -> None:
+        self.client = client
+        self.interval = interval
+        self.grace = grace
+        self.retry = retry
+        self.on_switch = on_switch
+        self.ws: Optional[ClientWebSocketResponse] = None
+        self.frames: Queue = Queue(size)
+        self.readers: Dict[ClientWebSocketResponse, Task] = {}
+        self.retiring: Dict[ClientWebSocketResponse, Task] = {}
+        self.task: Optional[Task] = None
+        self.lost = Event()
+        self.recent: Deque[str] = deque(maxlen=history)
+        self.recent_ids: Set[str] = set()
+        self.switches = 0
+        self.duplicates = 0
+
+    async def start(self) -> None:
+        self.ws = await self.client.ws_connect()
+        self.readers[self.ws] = get_event_loop().create_task(self.read(
+            self.ws))
+        self.task = get_event_loop().create_task(self.run())
+
+    async def stop(self) -> None:
+        sockets = set(self.readers) | set(self.retiring)
+        if self.ws is not None:
+            sockets.add(self.ws)
+        tasks: List[Task] = [*self.readers.values(), *self.retiring.values()]
+        if self.task is not None:
+            tasks.append(self.task)
+
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except CancelledError:
+                pass
+        for ws in sockets:
+            await ws.close()
+        self.readers.clear()
+        self.retiring.clear()
+        self.task = None
+
+    async def receive(self) -> Dict:
+        return await self.frames.get()
+
+    async def send_str(self, data: str) -> None:
+        await self.ws.send_str(data)
+
+    async def send_json(self,
+                        data: Any,
+                        dumps: Optional[Callable] = None) -> None:
+        await self.ws.send_json(data, dumps=dumps or codec.dumps)
+
+    def is_duplicate(self, data: Dict) -> bool:
+        frame_id = get_frame_id(data)
+        if frame_id is None:
+            return False
+        if frame_id in self.recent_ids:
+            self.duplicates += 1
+            return True
+        if len(self.recent) == self.recent.maxlen:
+            self.recent_ids.discard(self.recent[0])
+        self.recent.append(frame_id)
+        self.recent_ids.add(frame_id)
+        return False
+
+    async def read(self, ws: ClientWebSocketResponse) -> None:
+        try:
+            while True:
+                message = await ws.receive()
+                if message.type == WSMsgType.TEXT:
+                    try:
+                        data = codec.loads(message.data)
+                    except ValueError:
+                        continue
+                    if not self.is_duplicate(data):
+                        await self.frames.put(data)
+                elif message.type in CLOSED:
+                    break
+        finally:
+            self.readers.pop(ws, None)
+            if ws is self.ws:
+                self.lost.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await wait_for(self.lost.wait(), timeout=self.interval)
+            except TimeoutError:
+                pass
+
+            while True:
+                try:
+                    await self.switch()
+                    break
+                except (WebSocketConnectError, ClientError, OSError) as error:
+                    log.error(f"Websocket reconnection failed: {error!r}")
+                    await sleep(self.retry)
+
+            if self.on_switch is not None:
+                try:
+                    await self.on_switch()
+                except Exception as error:
+                    log.exception(error)
+
+    async def switch(self) -> None:
+        ws = await self.client.ws_connect()
+        self.readers[ws] = get_event_loop().create_task(self.read(ws))
+
+        old, self.ws = self.ws, ws
+        self.lost.clear()
+        self.switches += 1
+        self.retiring[old] = get_event_loop().create_task(self.retire(old))
+
+    async def retire(self, ws: ClientWebSocketResponse) -> None:
+        try:
+            await sleep(self.grace)
+            reader = self.readers.pop(ws, None)
+            await ws.close()
+            if reader is not None:
+                try:
+                    await wait_for(reader, timeout=self.grace)
+                except (TimeoutError, CancelledError):
+                    pass
+        finally:
+            self.retiring.pop(ws, None)
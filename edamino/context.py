@@ -7,7 +7,7 @@ from typing import (
     Literal
 )
 from contextlib import asynccontextmanager, contextmanager
-from ujson import dumps
+from . import codec
 from aiohttp import ClientWebSocketResponse
 
 
@@ -44,8 +44,8 @@ class Context:
     async def send_audio(self, audio: bytes):
         return await self.client.send_audio(audio, chat_id=self.msg.threadId)
 
-    async def download_from_link(self, link: str):
-        return await self.client.download_from_link(link)
+    async def download_from_link(self, link: str, max_size: Optional[int] = None):
+        return await self.client.download_from_link(link, max_size)
 
     async def send(self,
                    message: Optional[str] = None,
@@ -120,11 +120,11 @@ class Context:
         }
 
         try:
-            await self.ws.send_str(dumps(data))
+            await self.ws.send_str(codec.dumps(data))
             yield
         finally:
             data['t'] = 306
-            await self.ws.send_str(dumps(data))
+            await self.ws.send_str(codec.dumps(data))
 
     @asynccontextmanager
     async def recording(self, chat_type: int = 2):
@@ -141,11 +141,11 @@ class Context:
             "t": 304
         }
         try:
-            await self.ws.send_str(dumps(data))
+            await self.ws.send_str(codec.dumps(data))
             yield
         finally:
             data['t'] = 306
-            await self.ws.send_str(dumps(data))
+            await self.ws.send_str(codec.dumps(data))
 
     async def get_chat_messages(self, size: int = 25, page_token: Optional[str] = None):
         return await self.client.get_chat_messages(self.msg.threadId, size, page_token)
@@ -169,11 +169,14 @@ class Context:
 
     @contextmanager
     def set_ndc(self, ndc_id: int = 0):
+        # The client of the context is shared with other handlers of the
+        # community, so it is swapped instead of changed.
+        client = self.client
         try:
-            self.client.set_ndc(ndc_id)
+            self.client = client.with_ndc(ndc_id)
             yield
         finally:
-            self.client.set_ndc(self.msg.ndcId)
+            self.client = client
 
     async def get_message_info(self):
         return await self.client.get_message_info(self.msg.threadId, self.msg.messageId)
@@ -0,0 +1,220 @@
+from asyncio import Semaphore, Task, CancelledError, get_event_loop
+from collections import deque
+from contextvars import ContextVar
+from typing import (Any, Awaitable, Callable, Deque, Dict, Hashable, List,
+                    Optional, Set, Tuple)
+
+from .logger import logger as log
+
+__all__ = ['Dispatcher', 'Overflow']
+
+
+class Overflow:
+    BLOCK: str = 'block'
+    DROP_OLDEST: str = 'drop-oldest'
+    DROP_NEWEST: str = 'drop-newest'
+    ALL = (BLOCK, DROP_OLDEST, DROP_NEWEST)
+
+
+class Job:
+    __slots__ = ('dispatcher', 'key', 'released', 'done')
+
+    def __init__(self, dispatcher: 'Dispatcher',
+                 key: Optional[Hashable]) -> None:
+        self.dispatcher = dispatcher
+        self.key = key
+        self.released = False
+        self.done = False
+
+
+# The item handled by the current worker.
+RUNNING: ContextVar[Optional[Job]] = ContextVar('RUNNING', default=None)
+
+
+class Dispatcher:
+    """
+    Bounded queue between the websocket reader and a fixed pool of workers.
+
+    Items are split into lanes by ``key``. Items of one lane are handled one
+    at a time and in order, different lanes run in parallel up to the number
+    of workers and are served round-robin. Items with the key None are not
+    ordered.
+
+    When the queue is full the overflow policy decides whether the reader
+    waits for a free slot, the oldest queued item is dropped or the new item
+    is dropped.
+    """
+
+    __slots__ = ('callback', 'key', 'size', 'workers', 'overflow', 'lanes',
+                 'ready', 'busy', 'signal', 'slots', 'tasks', 'sequence',
+                 'count', 'received', 'processed', 'dropped', 'max_depth')
+
+    def __init__(self,
+                 callback: Callable[[Any], Awaitable[None]],
+                 key: Optional[Callable[[Any], Optional[Hashable]]] = None,
+                 size: int = 1000,
+                 workers: int = 16,
+                 overflow: str = Overflow.BLOCK) -> None:
+        if overflow not in Overflow.ALL:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if workers < 1:
+            raise ValueError("At least one worker is required.")
+
+        self.callback = callback
+        self.key = key
+        self.size = size
+        self.workers = workers
+        self.overflow = overflow
+        self.lanes: Dict[Optional[Hashable], Deque[Tuple[int, Any]]] = {}
+        self.ready: Deque[Optional[Hashable]] = deque()
+        self.busy: Set[Hashable] = set()
+        self.signal: Optional[Semaphore] = None
+        self.slots: Optional[Semaphore] = None
+        self.tasks: List[Task] = []
+        self.sequence = 0
+        self.count = 0
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    @property
+    def depth(self) -> int:
+        return self.count
+
+    @property
+    def backlog(self) -> Dict[Optional[Hashable], int]:
+        """
+        Number of queued items per lane.
+        """
+        return {key: len(lane) for key, lane in self.lanes.items() if lane}
+
+    def hot_lanes(self, count: int = 10) -> List[Tuple[Hashable, int]]:
+        return sorted(self.backlog.items(),
+                      key=lambda item: item[1],
+                      reverse=True)[:count]
+
+    def start(self) -> None:
+        if self.tasks:
+            return
+        loop = get_event_loop()
+        self.signal = Semaphore(0)
+        self.slots = Semaphore(self.size)
+        self.tasks = [
+            loop.create_task(self.worker()) for _ in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        for task in self.tasks:
+            try:
+                await task
+            except CancelledError:
+                pass
+        self.tasks.clear()
+
+    async def put(self, item: Any) -> None:
+        self.received += 1
+
+        if self.overflow == Overflow.BLOCK:
+            await self.slots.acquire()
+        elif self.count >= self.size:
+            self.dropped += 1
+            if self.overflow == Overflow.DROP_NEWEST:
+                return
+            self.drop_oldest()
+
+        key = self.key(item) if self.key is not None else None
+        lane = self.lanes.get(key)
+        if lane is None:
+            lane = self.lanes[key] = deque()
+        if not lane and key not in self.busy:
+            self.schedule(key)
+
+        lane.append((self.sequence, item))
+        self.sequence += 1
+        self.count += 1
+        if self.count > self.max_depth:
+            self.max_depth = self.count
+
+    def schedule(self, key: Optional[Hashable]) -> None:
+        self.ready.append(key)
+        self.signal.release()
+
+    def drop_oldest(self) -> None:
+        key = min((key for key, lane in self.lanes.items() if lane),
+                  key=lambda k: self.lanes[k][0][0])
+        self.lanes[key].popleft()
+        self.count -= 1
+
+    async def worker(self) -> None:
+        while True:
+            await self.signal.acquire()
+            key = self.ready.popleft()
+            if key in self.busy:
+                continue
+
+            lane = self.lanes.get(key)
+            if not lane:
+                if key is not None:
+                    self.lanes.pop(key, None)
+                continue
+
+            _, item = lane.popleft()
+            self.count -= 1
+            if self.overflow == Overflow.BLOCK:
+                self.slots.release()
+
+            if key is None:
+                if lane:
+                    self.schedule(key)
+            else:
+                self.busy.add(key)
+
+            job = Job(self, key)
+            token = RUNNING.set(job)
+            try:
+                await self.callback(item)
+            except (TypeError, KeyError, AttributeError):
+                pass
+            except Exception as error:
+                log.exception(error)
+            finally:
+                RUNNING.reset(token)
+                # Tasks started by the handler keep the job in their context.
+                job.done = True
+                self.processed += 1
+                if key is not None and not job.released:
+                    self.busy.discard(key)
+                    if lane:
+                        self.schedule(key)
+                    elif self.lanes.get(key) is lane:
+                        del self.lanes[key]
+
+            if job.released:
+                # A new worker took this one's place.
+                return
+
+    def release(self) -> None:
+        """
+        Frees the lane and the worker of the running handler, e.g. while it
+        waits for an answer. The next items of its lane start without waiting
+        for it.
+        """
+        job = RUNNING.get()
+        if (job is None or job.dispatcher is not self or job.released
+                or job.done):
+            return
+        job.released = True
+        self.tasks = [task for task in self.tasks if not task.done()]
+        self.tasks.append(get_event_loop().create_task(self.worker()))
+
+        key = job.key
+        if key is not None:
+            self.busy.discard(key)
+            lane = self.lanes.get(key)
+            if lane:
+                self.schedule(key)
+            elif lane is not None:
+                del self.lanes[key]
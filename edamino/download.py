@@ -0,0 +1,129 @@
+from time import monotonic
+from typing import AsyncIterator, Optional
+
+from aiofile import async_open
+from aiohttp import ClientSession
+
+from . import codec
+from .api import FileTooLarge, HtmlError, InvalidRequest
+
+__all__ = ['Download']
+
+CHUNK_SIZE = 64 * 1024
+RANGE_NOT_SATISFIABLE = 416
+
+
+class Download:
+    """
+    Streamed body of a link.
+
+    Iterating yields the chunks as they arrive. Downloads larger than
+    ``max_size`` bytes stop with FileTooLarge. With ``offset`` only the
+    rest of the body is requested, if the server ignores the range the
+    body starts over and ``offset`` is reset to 0.
+    """
+
+    __slots__ = ('session', 'link', 'chunk_size', 'max_size', 'offset',
+                 'received', 'total', 'started', 'finished')
+
+    def __init__(self,
+                 session: ClientSession,
+                 link: str,
+                 chunk_size: int = CHUNK_SIZE,
+                 max_size: Optional[int] = None,
+                 offset: int = 0) -> None:
+        self.session = session
+        self.link = link
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+        self.offset = offset
+        self.received = 0
+        self.total: Optional[int] = None
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        end = self.finished if self.finished is not None else monotonic()
+        return end - self.started
+
+    @property
+    def throughput(self) -> float:
+        """
+        Bytes per second.
+        """
+        elapsed = self.elapsed
+        return self.received / elapsed if elapsed else 0.0
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self.iterate()
+
+    def check_size(self, size: int) -> None:
+        if self.max_size is not None and size > self.max_size:
+            raise FileTooLarge(
+                f"{self.link} is larger than {self.max_size} bytes")
+
+    async def iterate(self) -> AsyncIterator[bytes]:
+        headers = {'Range': f'bytes={self.offset}-'} if self.offset else None
+        self.started = monotonic()
+        self.finished = None
+        self.received = 0
+
+        async with self.session.get(self.link, headers=headers) as response:
+            if response.status == RANGE_NOT_SATISFIABLE and self.offset:
+                # Nothing is left after the offset.
+                self.total = self.offset
+                self.finished = monotonic()
+                return
+            if response.status not in (200, 206):
+                body = await response.read()
+                try:
+                    js_resp = codec.loads(body)
+                except ValueError:
+                    raise HtmlError(body.decode(errors='replace'),
+                                    response.status) from None
+                raise InvalidRequest(js_resp['api:message'],
+                                     js_resp['api:statuscode'], js_resp,
+                                     response.status)
+
+            if response.status == 200:
+                self.offset = 0
+            if response.content_length is not None:
+                self.total = self.offset + response.content_length
+                self.check_size(self.total)
+
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                self.received += len(chunk)
+                self.check_size(self.offset + self.received)
+                yield chunk
+
+        self.finished = monotonic()
+
+    async def read(self) -> bytes:
+        return b''.join([chunk async for chunk in self])
+
+    async def save(self, path: str) -> None:
+        """
+        Writes the body to a file, after its first ``offset`` bytes when the
+        range was served.
+        """
+        file = None
+        try:
+            async for chunk in self:
+                if file is None:
+                    file = await self.open(path)
+                await file.write(chunk)
+            if file is None and not self.offset:
+                file = await self.open(path)
+        finally:
+            if file is not None:
+                await file.close()
+
+    async def open(self, path: str):
+        if not self.offset:
+            return await async_open(path, 'wb')
+        file = await async_open(path, 'r+b')
+        file.seek(self.offset)
+        return file
@@ -0,0 +1,62 @@
+from asyncio import Task, ensure_future, shield
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+__all__ = ['SingleFlight']
+
+
+class Flight:
+    __slots__ = ('task', 'waiters')
+
+    def __init__(self, task: Task) -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Identical calls made while one is in flight wait for its result instead
+    of making their own.
+
+    Every caller gets the result or the exception of the shared call, the
+    callers that joined it get the result passed through ``copy`` if one is
+    given. A cancelled caller does not cancel it for the others, the call is
+    only cancelled when no one waits for it anymore.
+    """
+
+    __slots__ = ('flights', 'started', 'coalesced')
+
+    def __init__(self) -> None:
+        self.flights: Dict[Hashable, Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+
+    def __len__(self) -> int:
+        return len(self.flights)
+
+    async def run(self,
+                  key: Hashable,
+                  call: Callable[[], Awaitable[Any]],
+                  copy: Optional[Callable[[Any], Any]] = None) -> Any:
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = self.flights[key] = Flight(ensure_future(call()))
+            flight.task.add_done_callback(lambda _: self.land(key, flight))
+            self.started += 1
+            joined = False
+        else:
+            self.coalesced += 1
+            joined = True
+
+        flight.waiters += 1
+        try:
+            result = await shield(flight.task)
+            return copy(result) if joined and copy is not None else result
+        finally:
+            flight.waiters -= 1
+            if not flight.waiters and not flight.task.done():
+                flight.task.cancel()
+                self.land(key, flight)
+
+    def land(self, key: Hashable, flight: Flight) -> None:
+        if self.flights.get(key) is flight:
+            del self.flights[key]
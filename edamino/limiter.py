@@ -0,0 +1,110 @@
+from asyncio import Lock, sleep
+from re import compile
+from time import monotonic
+from typing import Dict, Optional, Pattern, Tuple
+
+__all__ = ['RateLimiter', 'Bucket', 'LIMITS']
+
+# name: (pattern of "METHOD path", requests per second, burst)
+LIMITS: Dict[str, Tuple[str, float, int]] = {
+    'message': (r'POST chat/thread/[^/?]+/message(\?|$)', 2, 5),
+    'member': (r'(POST|DELETE) (chat/)?thread/[^/?]+/member', 1, 3),
+    'follow': (r'(POST|DELETE) user-profile/[^/?]+/joined', 1, 3),
+    'vote': (r'(POST|DELETE) (feed/vote|(blog|item)/[^/?]+/vote)', 1, 5),
+}
+
+
+class Bucket:
+    """
+    Token bucket refilled with ``rate`` tokens per second up to ``burst``.
+
+    Callers that have to wait are served in the order they came in.
+    """
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'lock', 'acquired',
+                 'delayed', 'waited', 'max_wait')
+
+    def __init__(self, rate: float, burst: int = 1) -> None:
+        if rate <= 0:
+            raise ValueError("The rate must be positive.")
+
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self.tokens = float(self.burst)
+        self.updated = monotonic()
+        self.lock: Optional[Lock] = None
+        self.acquired = 0
+        self.delayed = 0
+        self.waited = 0.0
+        self.max_wait = 0.0
+
+    def refill(self) -> None:
+        now = monotonic()
+        self.tokens = min(self.burst,
+                          self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """
+        Takes a token and returns how long it waited for it.
+        """
+        if self.lock is None:
+            self.lock = Lock()
+
+        start = monotonic()
+        async with self.lock:
+            self.refill()
+            if self.tokens < 1:
+                await sleep((1 - self.tokens) / self.rate)
+                self.refill()
+            self.tokens -= 1
+
+        waited = monotonic() - start
+        self.acquired += 1
+        if waited > 0.001:
+            self.delayed += 1
+            self.waited += waited
+            if waited > self.max_wait:
+                self.max_wait = waited
+        return waited
+
+
+class RateLimiter:
+    """
+    Token buckets matched by ``METHOD path`` of a request, the path is
+    relative to the community prefix so every community shares a bucket.
+    Requests that match no pattern are not limited.
+    """
+
+    __slots__ = ('patterns', 'buckets')
+
+    def __init__(
+            self,
+            limits: Optional[Dict[str, Tuple[str, float,
+                                             int]]] = None) -> None:
+        if limits is None:
+            limits = LIMITS
+        self.patterns: Tuple[Tuple[str, Pattern], ...] = tuple(
+            (name, compile(pattern))
+            for name, (pattern, _, _) in limits.items())
+        self.buckets: Dict[str, Bucket] = {
+            name: Bucket(rate, burst)
+            for name, (_, rate, burst) in limits.items()
+        }
+
+    @property
+    def waits(self) -> Dict[str, float]:
+        """
+        Average wait of the delayed requests per bucket.
+        """
+        return {
+            name: bucket.waited / bucket.delayed if bucket.delayed else 0.0
+            for name, bucket in self.buckets.items()
+        }
+
+    def get_bucket(self, method: str, path: str) -> Optional[Bucket]:
+        request = f'{method} {path}'
+        for name, pattern in self.patterns:
+            if pattern.match(request):
+                return self.buckets[name]
+        return None
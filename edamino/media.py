@@ -0,0 +1,90 @@
+from asyncio import get_event_loop
+from hashlib import sha256
+from time import time
+from typing import Dict, Optional, Tuple
+
+from aiofile import async_open
+
+from . import codec
+from .api import OFFLOAD_SIZE
+
+__all__ = ['MediaCache']
+
+
+def get_digest(data: bytes) -> str:
+    return sha256(data).hexdigest()
+
+
+class MediaCache:
+    """
+    Media values of uploaded files keyed by the hash of their content, so
+    the same file is uploaded once.
+
+    Entries live for ``ttl`` seconds. With ``path`` they are loaded from and
+    saved to a JSON file, so they survive restarts.
+    """
+
+    __slots__ = ('ttl', 'path', 'entries', 'hits', 'misses')
+
+    def __init__(self,
+                 ttl: float = 60 * 60 * 24,
+                 path: Optional[str] = None) -> None:
+        self.ttl = ttl
+        self.path = path
+        self.entries: Dict[str, Tuple[float, str]] = {}
+        self.hits = 0
+        self.misses = 0
+        if path is not None:
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def get_key(self, target: str, content_type: str,
+                      data: bytes) -> str:
+        if len(data) >= OFFLOAD_SIZE:
+            digest = await get_event_loop().run_in_executor(
+                None, get_digest, data)
+        else:
+            digest = get_digest(data)
+        return f'{target} {content_type} {digest}'
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None or entry[0] <= time():
+            self.entries.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    async def put(self, key: str, media_value: str) -> None:
+        self.entries[key] = (time() + self.ttl, media_value)
+        if self.path is not None:
+            await self.save()
+
+    def load(self) -> None:
+        try:
+            with open(self.path) as file:
+                entries = codec.loads(file.read())
+        except (FileNotFoundError, ValueError):
+            return
+        now = time()
+        self.entries = {
+            key: (expires, media_value)
+            for key, (expires, media_value) in entries.items() if expires > now
+        }
+
+    async def save(self) -> None:
+        now = time()
+        self.entries = {
+            key: entry
+            for key, entry in self.entries.items() if entry[0] > now
+        }
+        async with async_open(self.path, 'w') as file:
+            await file.write(codec.dumps(self.entries))
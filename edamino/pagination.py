@@ -0,0 +1,174 @@
+from asyncio import Task, ensure_future
+from collections import deque
+from typing import (AsyncIterator, Awaitable, Callable, Deque, Generic,
+                    Optional, Sequence, Tuple, TypeVar, Union)
+
+__all__ = ['paginate', 'TokenPages']
+
+T = TypeVar('T')
+
+
+async def paginate(fetch: Callable[..., Awaitable[Sequence[T]]],
+                   start: int = 0,
+                   size: int = 100,
+                   prefetch: int = 2,
+                   limit: Optional[int] = None) -> AsyncIterator[T]:
+    """
+    Items of an endpoint paginated by ``start`` and ``size``.
+
+    While the caller handles a page, the next ``prefetch`` pages are
+    requested, so at most ``prefetch + 1`` pages are held at once.
+    The iteration stops at the first page shorter than ``size`` or after
+    ``limit`` items.
+    """
+    if size < 1:
+        raise ValueError("The page size must be positive.")
+
+    end = start + limit if limit is not None else None
+    pending: Deque[Task] = deque()
+    offset = start
+
+    def request() -> bool:
+        nonlocal offset
+        if end is not None and offset >= end:
+            return False
+        pending.append(ensure_future(fetch(start=offset, size=size)))
+        offset += size
+        return True
+
+    try:
+        request()
+        position = start
+        while pending:
+            page = await pending.popleft()
+            last = len(page) < size
+            if last:
+                for task in pending:
+                    task.cancel()
+                pending.clear()
+            else:
+                while len(pending) < prefetch and request():
+                    pass
+
+            for item in page:
+                if end is not None and position >= end:
+                    return
+                position += 1
+                yield item
+
+            if last:
+                return
+            if not pending:
+                request()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+class TokenPages(Generic[T]):
+    """
+    Items of an endpoint paginated by ``nextPageToken``, or whole pages with
+    ``pages=True``.
+
+    The next page is requested as soon as a page arrives, so it loads while
+    the caller handles the current one. The iteration stops when there is no
+    next page, after ``limit`` items or at the first item for which ``stop``
+    is true.
+
+    ``page_token`` is the token of the first page that was not handed out
+    completely, it can be passed to a new iterator to resume. It is None
+    once the last page was handed out.
+    """
+
+    __slots__ = ('fetch', 'page_token', 'size', 'limit', 'pages', 'stop',
+                 'count', 'requested', 'task', 'buffer', 'finished')
+
+    def __init__(self,
+                 fetch: Callable[[Optional[str], int],
+                                 Awaitable[Tuple[Sequence[T], Optional[str]]]],
+                 page_token: Optional[str] = None,
+                 size: int = 100,
+                 limit: Optional[int] = None,
+                 pages: bool = False,
+                 stop: Optional[Callable[[T], bool]] = None) -> None:
+        self.fetch = fetch
+        self.page_token = page_token
+        self.size = size
+        self.limit = limit
+        self.pages = pages
+        self.stop = stop
+        self.count = 0
+        self.requested = page_token
+        self.task: Optional[Task] = None
+        self.buffer: Deque[T] = deque()
+        self.finished = limit is not None and limit <= 0
+
+    def __aiter__(self) -> 'TokenPages[T]':
+        return self
+
+    async def __anext__(self) -> Union[T, Tuple[T, ...]]:
+        if self.pages:
+            page = await self.next_page()
+            if page is None:
+                raise StopAsyncIteration
+            self.page_token = self.requested
+            return page
+
+        if not self.buffer:
+            page = await self.next_page()
+            if page is None:
+                raise StopAsyncIteration
+            self.buffer.extend(page)
+        item = self.buffer.popleft()
+        if not self.buffer:
+            self.page_token = self.requested
+        return item
+
+    def request(self) -> None:
+        size = self.size
+        if self.limit is not None:
+            size = min(size, self.limit - self.count)
+        self.task = ensure_future(self.fetch(self.requested, size))
+
+    async def next_page(self) -> Optional[Tuple[T, ...]]:
+        while not self.finished:
+            if self.task is None:
+                self.request()
+            try:
+                items, token = await self.task
+            finally:
+                self.task = None
+
+            page = tuple(items or ())
+            cut = False
+            if self.stop is not None:
+                for index, item in enumerate(page):
+                    if self.stop(item):
+                        page, cut = page[:index], True
+                        break
+            if self.limit is not None and len(page) > self.limit - self.count:
+                page, cut = page[:self.limit - self.count], True
+            self.count += len(page)
+
+            if cut:
+                # The rest of this page was not handed out.
+                self.finished = True
+            elif not token:
+                self.finished = True
+                self.requested = None
+            else:
+                self.requested = token
+                if self.limit is not None and self.count >= self.limit:
+                    self.finished = True
+                else:
+                    self.request()
+
+            if page:
+                return page
+        return None
+
+    async def aclose(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        self.finished = True
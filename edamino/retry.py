@@ -0,0 +1,221 @@
+from asyncio import TimeoutError, sleep
+from random import uniform
+from re import compile
+from time import monotonic
+from typing import Awaitable, Callable, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from aiohttp import ClientConnectorError, ClientError
+
+from .api import CircuitOpen, HtmlError, InvalidRequest
+
+__all__ = ['RetryPolicy', 'Breaker']
+
+IDEMPOTENT = ('GET', 'PUT', 'DELETE', 'HEAD', 'OPTIONS')
+ID = compile(r'\d')
+
+
+def get_endpoint(url: str) -> str:
+    """
+    Endpoint of a url without ids, e.g. ``chat/thread`` for
+    ``.../x123/s/chat/thread/<id>/message``.
+    """
+    _, host, path, _, _ = urlsplit(url)
+    _, sep, path = path.partition('/s/')
+    if not sep:
+        return host
+    parts = []
+    for part in path.split('/')[:2]:
+        if not part or ID.search(part):
+            break
+        parts.append(part)
+    return '/'.join(parts) or host
+
+
+def get_retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    try:
+        return float(headers['Retry-After'])
+    except (KeyError, ValueError):
+        return None
+
+
+class Breaker:
+    """
+    Circuit breaker of one endpoint.
+
+    After ``threshold`` failures in a row the circuit opens and calls fail
+    fast. After ``recovery`` seconds one trial call is let through, its
+    result closes the circuit or opens it again.
+    """
+
+    CLOSED: str = 'closed'
+    OPEN: str = 'open'
+    HALF_OPEN: str = 'half-open'
+
+    __slots__ = ('threshold', 'recovery', 'state', 'failures', 'opened',
+                 'trial', 'trips')
+
+    def __init__(self, threshold: int = 5, recovery: float = 30) -> None:
+        self.threshold = threshold
+        self.recovery = recovery
+        self.state = Breaker.CLOSED
+        self.failures = 0
+        self.opened = 0.0
+        self.trial = False
+        self.trips = 0
+
+    def allow(self) -> bool:
+        if self.state == Breaker.OPEN:
+            if monotonic() - self.opened < self.recovery:
+                return False
+            self.state = Breaker.HALF_OPEN
+        if self.state == Breaker.HALF_OPEN:
+            if self.trial:
+                return False
+            self.trial = True
+        return True
+
+    def success(self) -> None:
+        self.state = Breaker.CLOSED
+        self.failures = 0
+        self.trial = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        self.trial = False
+        if self.threshold < 1:
+            return
+        if self.state == Breaker.HALF_OPEN or self.failures >= self.threshold:
+            if self.state != Breaker.OPEN:
+                self.trips += 1
+            self.state = Breaker.OPEN
+            self.opened = monotonic()
+
+    def release(self) -> None:
+        # The trial call was cancelled before it had a result.
+        self.trial = False
+
+
+class RetryPolicy:
+    """
+    Retries of transient API errors with exponential backoff and full jitter.
+
+    Timeouts, connection errors, 5xx responses and html pages are retried
+    for idempotent methods. Other methods are only retried when the request
+    was never sent or was rejected with a rate limit status, since they may
+    have been applied already. ``Retry-After`` is respected up to ``cap``
+    seconds.
+
+    Every endpoint has its own circuit breaker, ``threshold=0`` disables
+    them and ``attempts=1`` disables retries.
+    """
+
+    __slots__ = ('attempts', 'base', 'cap', 'threshold', 'recovery',
+                 'rate_limited', 'breakers', 'calls', 'retries', 'failures',
+                 'rejected')
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base: float = 0.5,
+        cap: float = 10,
+        threshold: int = 5,
+        recovery: float = 30,
+        rate_limited: Tuple[int, ...] = (429, )) -> None:
+        if attempts < 1:
+            raise ValueError("At least one attempt is required.")
+
+        self.attempts = attempts
+        self.base = base
+        self.cap = cap
+        self.threshold = threshold
+        self.recovery = recovery
+        self.rate_limited = rate_limited
+        self.breakers: Dict[str, Breaker] = {}
+        self.calls: Dict[str, int] = {}
+        self.retries: Dict[str, int] = {}
+        self.failures: Dict[str, int] = {}
+        self.rejected: Dict[str, int] = {}
+
+    @property
+    def states(self) -> Dict[str, str]:
+        """
+        State of the circuit breaker per endpoint.
+        """
+        return {
+            endpoint: breaker.state
+            for endpoint, breaker in self.breakers.items()
+        }
+
+    def get_breaker(self, endpoint: str) -> Breaker:
+        breaker = self.breakers.get(endpoint)
+        if breaker is None:
+            breaker = self.breakers[endpoint] = Breaker(
+                self.threshold, self.recovery)
+        return breaker
+
+    @staticmethod
+    def is_failure(error: Exception) -> bool:
+        """
+        Whether the error means the backend is unhealthy.
+        """
+        if isinstance(error, InvalidRequest):
+            return error.http_status is not None and error.http_status >= 500
+        if isinstance(error, HtmlError):
+            return error.http_status is None or not 400 <= error.http_status < 500
+        return isinstance(error, (ClientError, TimeoutError, OSError))
+
+    def is_retryable(self, method: str, error: Exception) -> bool:
+        if getattr(error, 'http_status', None) in self.rate_limited:
+            return True
+        if isinstance(error, ClientConnectorError):
+            return True
+        return method in IDEMPOTENT and self.is_failure(error)
+
+    def get_delay(self, attempt: int, error: Exception) -> Optional[float]:
+        delay = uniform(0, min(self.cap, self.base * 2**(attempt - 1)))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after is not None:
+            if retry_after > self.cap:
+                return None
+            delay = max(delay, retry_after)
+        return delay
+
+    async def call(self, method: str, url: str,
+                   send: Callable[[], Awaitable[Dict]]) -> Dict:
+        endpoint = get_endpoint(url)
+        breaker = self.get_breaker(endpoint)
+        self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+                raise CircuitOpen(endpoint)
+
+            attempt += 1
+            try:
+                response = await send()
+            except Exception as error:
+                if self.is_failure(error):
+                    self.failures[endpoint] = self.failures.get(endpoint,
+                                                                0) + 1
+                    breaker.failure()
+                else:
+                    breaker.success()
+
+                if attempt >= self.attempts or not self.is_retryable(
+                        method, error):
+                    raise
+                delay = self.get_delay(attempt, error)
+                if delay is None:
+                    raise
+                self.retries[endpoint] = self.retries.get(endpoint, 0) + 1
+                await sleep(delay)
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+
+            breaker.success()
+            return response
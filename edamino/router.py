@@ -0,0 +1,74 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+__all__ = ['CommandRouter']
+
+
+class _Node:
+    __slots__ = ('children', 'entry')
+
+    def __init__(self) -> None:
+        self.children: Dict[str, '_Node'] = {}
+        self.entry: Optional[Tuple[int, int, Any, str]] = None
+
+
+class CommandRouter:
+    """
+    Prefix tree of the registered commands.
+
+    Matching walks the lowercased message once, so the cost depends on the
+    length of the command and not on the number of registered handlers.
+    """
+
+    __slots__ = ('root', 'count')
+
+    def __init__(self) -> None:
+        self.root = _Node()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __contains__(self, command: str) -> bool:
+        node = self.root
+        for char in command:
+            node = node.children.get(char)
+            if node is None:
+                return False
+        return node.entry is not None
+
+    def add(self, handler: Any, commands: List[str]) -> None:
+        order = self.count
+        for position, command in enumerate(commands):
+            node = self.root
+            for char in command:
+                child = node.children.get(char)
+                if child is None:
+                    child = node.children[char] = _Node()
+                node = child
+            node.entry = (order, position, handler, command)
+        self.count += 1
+
+    def match(self, content: str) -> Iterator[Tuple[Any, str]]:
+        """
+        Yields (handler, command) for every handler whose command is a prefix
+        of the content, in registration order. For each handler the first
+        matching command from its list is used.
+        """
+        entries = []
+        node = self.root
+        if node.entry is not None:
+            entries.append(node.entry)
+        for char in content:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.entry is not None:
+                entries.append(node.entry)
+
+        if len(entries) > 1:
+            entries.sort()
+        last = -1
+        for order, _, handler, command in entries:
+            if order != last:
+                last = order
+                yield handler, command
@@ -0,0 +1,144 @@
+from typing import Any, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, ValidationError
+from pydantic.fields import (ModelField, SHAPE_LIST, SHAPE_SINGLETON,
+                             SHAPE_TUPLE_ELLIPSIS)
+
+__all__ = ['View', 'Mode', 'construct', 'get_builder']
+
+Model = TypeVar('Model', bound=BaseModel)
+
+# Fields of a model: (name, alias, nested model, container of a list, field).
+Plan = Tuple[Tuple[str, str, Optional[Type[BaseModel]], Optional[type],
+                   ModelField], ...]
+PLANS: Dict[Type[BaseModel], Plan] = {}
+CONTAINERS = {SHAPE_LIST: list, SHAPE_TUPLE_ELLIPSIS: tuple}
+
+
+# MODEL validates responses, CONSTRUCT builds the models of trusted responses
+# without validation, VIEW validates a field the first time it is read and
+# RAW returns the decoded dicts.
+class Mode:
+    MODEL: str = 'model'
+    CONSTRUCT: str = 'construct'
+    VIEW: str = 'view'
+    RAW: str = 'raw'
+    ALL = (MODEL, CONSTRUCT, VIEW, RAW)
+
+
+def get_plan(model: Type[BaseModel]) -> Plan:
+    plan = []
+    for name, field in model.__fields__.items():
+        inner = field.type_
+        if not (isinstance(inner, type) and issubclass(inner, BaseModel) and
+                (field.shape == SHAPE_SINGLETON or field.shape in CONTAINERS)):
+            inner = None
+        plan.append(
+            (name, field.alias, inner, CONTAINERS.get(field.shape), field))
+    return tuple(plan)
+
+
+def construct(model: Type[Model], data: Dict) -> Model:
+    """
+    The model of a trusted response built without validation, nested
+    models included. Values are not converted, a field holds whatever the
+    response has.
+    """
+    plan = PLANS.get(model)
+    if plan is None:
+        plan = PLANS[model] = get_plan(model)
+
+    values = {}
+    fields_set = set()
+    for name, alias, inner, container, field in plan:
+        if alias not in data:
+            values[name] = field.get_default()
+            continue
+        value = data[alias]
+        if inner is not None:
+            if container is None:
+                if isinstance(value, dict):
+                    value = construct(inner, value)
+            elif isinstance(value, list):
+                value = container(
+                    construct(inner, item) if isinstance(item, dict) else item
+                    for item in value)
+        values[name] = value
+        fields_set.add(name)
+
+    obj = model.__new__(model)
+    object.__setattr__(obj, '__dict__', values)
+    object.__setattr__(obj, '__fields_set__', fields_set)
+    if model.__private_attributes__:
+        obj._init_private_attributes()
+    return obj
+
+
+def build_model(model: Type[Model], data: Dict) -> Model:
+    return model(**data)
+
+
+def build_raw(model: Type[BaseModel], data: Dict) -> Dict:
+    return data
+
+
+def get_builder(mode: str) -> Callable[[Type[Model], Dict], Any]:
+    if mode == Mode.MODEL:
+        return build_model
+    if mode == Mode.CONSTRUCT:
+        return construct
+    if mode == Mode.VIEW:
+        return View
+    if mode == Mode.RAW:
+        return build_raw
+    raise ValueError(f"Unknown mode: {mode}")
+
+
+class View:
+    """
+    Attribute access to a raw response without validating all of it.
+
+    A field is validated the first time it is read, so nested models are
+    only built when they are used. ``materialize`` builds the full model.
+    """
+
+    __slots__ = ('__model', '__data', '__cache')
+
+    def __init__(self, model: Type[Model], data: Dict, **fields: Any) -> None:
+        object.__setattr__(self, '_View__model', model)
+        object.__setattr__(self, '_View__data', data)
+        object.__setattr__(self, '_View__cache', fields)
+
+    def __getattr__(self, name: str) -> Any:
+        cache = self.__cache
+        try:
+            return cache[name]
+        except KeyError:
+            pass
+
+        model = self.__model
+        try:
+            field = model.__fields__[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+        value, errors = field.validate(self.__data.get(field.alias),
+                                       cache,
+                                       loc=name,
+                                       cls=model)
+        if errors:
+            raise ValidationError([errors], model)
+        cache[name] = value
+        return value
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        self.__cache[name] = value
+
+    def __repr__(self) -> str:
+        return f'View[{self.__model.__name__}]({self.__data!r})'
+
+    def materialize(self) -> Model:
+        model = self.__model(**self.__data)
+        for name, value in self.__cache.items():
+            setattr(model, name, value)
+        return model
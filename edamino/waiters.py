@@ -0,0 +1,120 @@
+from asyncio import Future, get_event_loop
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .objects import SocketAnswer
+
+__all__ = ['Waiters']
+
+# Waiters are indexed by the first hint they have in this order, the most
+# selective first.
+INDEX = ('channel_key', 'chat_id', 'uid', 't')
+
+
+def get_frame_keys(data: Dict) -> Dict[str, Any]:
+    o = data.get('o')
+    if not isinstance(o, dict):
+        return {'t': data.get('t')}
+    message = o.get('chatMessage')
+    if not isinstance(message, dict):
+        message = {}
+    return {
+        't': data.get('t'),
+        'chat_id': message.get('threadId') or o.get('threadId'),
+        'uid': message.get('uid'),
+        'channel_key': o.get('channelKey')
+    }
+
+
+class Waiter:
+    __slots__ = ('future', 'check', 'hints', 'key')
+
+    def __init__(self, future: Future, check: Optional[Callable[[SocketAnswer],
+                                                                bool]],
+                 hints: Dict[str, Any]) -> None:
+        self.future = future
+        self.check = check
+        self.hints = hints
+        self.key: Optional[Tuple[str, Any]] = next(
+            ((name, hints[name]) for name in INDEX if name in hints), None)
+
+
+class Waiters:
+    """
+    Pending wait_for calls.
+
+    A frame only wakes the waiters whose hints match it: the ones indexed by
+    one of its keys and the ones without hints.
+    """
+
+    __slots__ = ('index', 'unkeyed', 'count')
+
+    def __init__(self) -> None:
+        self.index: Dict[Tuple[str, Any], Set[Waiter]] = {}
+        self.unkeyed: Set[Waiter] = set()
+        self.count = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, check: Optional[Callable[[SocketAnswer], bool]],
+            **hints: Any) -> Waiter:
+        hints = {
+            name: value
+            for name, value in hints.items() if value is not None
+        }
+        waiter = Waiter(get_event_loop().create_future(), check, hints)
+        if waiter.key is None:
+            self.unkeyed.add(waiter)
+        else:
+            self.index.setdefault(waiter.key, set()).add(waiter)
+        self.count += 1
+        return waiter
+
+    def discard(self, waiter: Waiter) -> None:
+        if waiter.key is None:
+            bucket = self.unkeyed
+        else:
+            bucket = self.index.get(waiter.key)
+            if bucket is None:
+                return
+        if waiter not in bucket:
+            return
+
+        bucket.remove(waiter)
+        if not bucket and waiter.key is not None:
+            del self.index[waiter.key]
+        self.count -= 1
+
+    def notify(self, data: Dict) -> None:
+        keys = get_frame_keys(data)
+        candidates: List[Waiter] = list(self.unkeyed)
+        for name in INDEX:
+            value = keys.get(name)
+            if value is not None:
+                bucket = self.index.get((name, value))
+                if bucket:
+                    candidates.extend(bucket)
+        if not candidates:
+            return
+
+        answer: Optional[SocketAnswer] = None
+        for waiter in candidates:
+            if waiter.future.done():
+                continue
+            if any(
+                    keys.get(name) != value
+                    for name, value in waiter.hints.items()):
+                continue
+            if answer is None:
+                answer = SocketAnswer(**data)
+            if waiter.check is not None:
+                try:
+                    if not waiter.check(answer):
+                        continue
+                except Exception as error:
+                    # The error of a check goes to the caller of wait_for.
+                    waiter.future.set_exception(error)
+                    self.discard(waiter)
+                    continue
+            waiter.future.set_result(answer)
+            self.discard(waiter)
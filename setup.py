@@ -28,6 +28,10 @@ setup(
         'pydantic',
         'aiofile'
     ],
+    extras_require={
+        'orjson': ['orjson'],
+        'msgspec': ['msgspec']
+    },
     classifiers=[
         'License :: OSI Approved :: MIT License',
         'Operating System :: Microsoft :: Windows',
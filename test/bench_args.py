@@ -0,0 +1,55 @@
+"""
+Argument parsing of the compiled plans against the per-message signature
+walk they replaced.
+
+    PYTHONPATH=. python test/bench_args.py
+"""
+from contextlib import suppress
+from timeit import repeat
+
+from edamino import Context
+from edamino.arguments import Arguments
+
+NUMBER = 20000
+
+
+def get_annotations(callback, words, command, message):
+    args = []
+    for count, (name, annotation) in enumerate(
+        [item for item in callback.__annotations__.items()][1:]):
+        if name == 'args':
+            args.append(message.replace(command, '', 1))
+        else:
+            with suppress(IndexError):
+                word = words[count]
+                args.append(annotation(word))
+                message = message.replace(word, '', 1)
+    return args
+
+
+async def send(ctx: Context, coins: int, link: str):
+    pass
+
+
+async def say(ctx: Context, args: str):
+    pass
+
+
+def measure(call) -> float:
+    return min(repeat(call, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main() -> None:
+    words = ' ' + ' '.join(['word'] * 200)
+    for name, callback, content in (('send, 2 words', send, ' 5 http://x'),
+                                    ('say, 2 words', say, ' hello world'),
+                                    ('say, 200 words', say, words)):
+        plan = Arguments(callback)
+        old = measure(
+            lambda: get_annotations(callback, content.split(), '/x', content))
+        new = measure(lambda: plan.parse(content))
+        print(f'{name:15s} get_annotations {old:6.2f} us  plan {new:5.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Bulk user lookups against a local stand-in of the api answering after
+50 ms: one by one, with bounded concurrency and with a warm response cache.
+Profiles of ids ending in 13 fail.
+
+    PYTHONPATH=. python test/bench_bulk.py
+"""
+import asyncio
+from random import Random
+from time import perf_counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client
+from edamino.cache import ResponseCache
+from edamino.retry import RetryPolicy
+
+LATENCY = 0.05
+
+
+class Server:
+    __slots__ = ('server', 'requests', 'live', 'peak')
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.live = 0
+        self.peak = 0
+        app = web.Application()
+        app.router.add_get('/s/user-profile/{uid}', self.profile)
+        self.server = TestServer(app)
+
+    def reset(self) -> None:
+        self.requests = 0
+        self.peak = 0
+
+    async def profile(self, request):
+        self.requests += 1
+        self.live += 1
+        self.peak = max(self.peak, self.live)
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.live -= 1
+        uid = request.match_info['uid']
+        if uid.endswith('13'):
+            return web.json_response(
+                {
+                    'api:message': 'Not found.',
+                    'api:statuscode': 225
+                },
+                status=400)
+        return web.json_response(
+            {'userProfile': {
+                'uid': uid,
+                'nickname': 'nickname'
+            }})
+
+    def get_client(self, cache=None) -> Client:
+        client = Client(retry=RetryPolicy(attempts=1), cache=cache)
+        client.prefix = f'http://{self.server.host}:{self.server.port}/s/'
+        return client
+
+
+async def main() -> None:
+    random = Random(0)
+    uids = [f'u{random.randrange(150)}' for _ in range(300)]
+    unique = len(set(uids))
+    server = Server()
+    await server.server.start_server(access_log=None)
+    print(f'{len(uids)} ids, {unique} unique')
+
+    client = server.get_client()
+    started = perf_counter()
+    for uid in dict.fromkeys(uids):
+        try:
+            await client.get_user_info(uid)
+        except Exception:
+            pass
+    print(f'one by one:     {perf_counter() - started:5.2f} s, '
+          f'{server.requests} requests')
+
+    for concurrency in (10, 50):
+        server.reset()
+        started = perf_counter()
+        results = await client.get_users_info(uids, concurrency)
+        errors = sum(isinstance(result, Exception) for result in results)
+        print(
+            f'concurrency={concurrency:<3d} {perf_counter() - started:5.2f} s, '
+            f'{server.requests} requests, {server.peak} in flight, '
+            f'{errors} errors')
+    await client.session.close()
+
+    client = server.get_client(ResponseCache())
+    await client.get_users_info(uids, 50)
+    server.reset()
+    started = perf_counter()
+    await client.get_users_info(uids, 50)
+    print(f'warm cache:     {perf_counter() - started:5.2f} s, '
+          f'{server.requests} requests (errors are not cached)')
+    await client.session.close()
+    await server.server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""
+Decode and encode time of every available codec for a chat message frame, a
+page of 100 user profiles and a page of 100 chat messages.
+
+    PYTHONPATH=. python test/bench_codec.py
+"""
+from time import perf_counter
+
+from edamino import codec
+from payloads import get_frame, get_messages, get_profile, get_uid
+
+PAYLOADS = (
+    ('message frame', get_frame(get_messages(1)[0]), 20000),
+    ('100 profiles', {
+        'api:statuscode': 0,
+        'userProfileList': [get_profile(get_uid()) for _ in range(100)]
+    }, 300),
+    ('100 messages', {
+        'api:statuscode': 0,
+        'messageList': get_messages(100),
+        'paging': {
+            'nextPageToken': get_uid()
+        }
+    }, 300),
+)
+
+
+def measure(call, data, number: int) -> float:
+    started = perf_counter()
+    for _ in range(number):
+        call(data)
+    return (perf_counter() - started) / number * 1e6
+
+
+def main() -> None:
+    print(
+        f'{"payload":22s} {"codec":8s} {"decode us":>10s} {"encode us":>10s}')
+    for name, payload, number in PAYLOADS:
+        body = codec.get_codec('json')[0](payload)
+        label = f'{name} ({len(body) // 1024} KB)'
+        for codec_name in codec.CODECS:
+            try:
+                encode, _, loads = codec.get_codec(codec_name)
+            except ImportError:
+                continue
+            assert loads(body) == payload
+            print(f'{label:22s} {codec_name:8s} '
+                  f'{measure(loads, body, number):10.1f} '
+                  f'{measure(encode, payload, number):10.1f}')
+            label = ''
+
+
+if __name__ == '__main__':
+    main()
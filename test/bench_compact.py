@@ -0,0 +1,61 @@
+"""
+Memory kept per message and time per message, frame decode included, for the
+decoded dicts, Message and CompactMessage, over 20000 chat frames of 200
+users in 20 chats.
+
+    PYTHONPATH=. python test/bench_compact.py
+"""
+import gc
+import tracemalloc
+from time import perf_counter
+
+from edamino import codec, compact, objects
+from edamino.compact import CompactMessage
+from payloads import get_frame, get_messages
+
+FRAMES = [codec.encode(get_frame(message)) for message in get_messages(20000)]
+TIMED = 5000
+
+
+def measure(name: str, make) -> None:
+    started = perf_counter()
+    for frame in FRAMES[:TIMED]:
+        make(codec.loads(frame)['o'])
+    elapsed = (perf_counter() - started) / TIMED * 1e6
+
+    gc.collect()
+    tracemalloc.start()
+    kept = [make(codec.loads(frame)['o']) for frame in FRAMES]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    print(f'{name:26s} {size / len(FRAMES):6.0f} B/msg  {elapsed:5.1f} us/msg')
+
+
+def make_compact(data):
+    return CompactMessage(data['chatMessage'], data.get('ndcId'))
+
+
+def main() -> None:
+    measure('dict', lambda data: data['chatMessage'])
+    measure(
+        'objects.Message',
+        lambda data: objects.Message(**data['chatMessage'],
+                                     ndcId=data.get('ndcId')))
+    measure('CompactMessage', make_compact)
+
+    intern_str = compact.intern_str
+    compact.intern_str = lambda value: value
+    measure('CompactMessage, no intern', make_compact)
+    compact.intern_str = intern_str
+
+    try:
+        codec.use('orjson')
+    except ImportError:
+        return
+    measure('CompactMessage, orjson', make_compact)
+    codec.use('ujson')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""
+Memory and time per handler context with the cached client of the community
+against a new Client for every context.
+
+    PYTHONPATH=. python test/bench_context.py
+"""
+import asyncio
+import tracemalloc
+from timeit import repeat
+
+from edamino import Bot, Client, Context
+from edamino.objects import Message
+
+COUNT = 1000
+NUMBER = 20000
+
+
+def measure(create) -> str:
+    create()
+    tracemalloc.start()
+    contexts = [create() for _ in range(COUNT)]
+    size, _ = tracemalloc.get_traced_memory()
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    blocks = sum(stat.count for stat in snapshot.statistics('filename'))
+    del contexts
+    elapsed = min(repeat(create, number=NUMBER, repeat=5)) / NUMBER * 1e6
+    return (f'{size / COUNT:5.0f} B/context, {blocks / COUNT:4.1f} live '
+            f'blocks/context, {elapsed:.2f} us')
+
+
+async def main() -> None:
+    bot = Bot('email', 'password')
+    bot.client = Client()
+    bot.client.login_sid('sid', 'uid')
+    bot.sid, bot.uid = 'sid', 'uid'
+    msg = Message(ndcId=42,
+                  threadId='thread',
+                  content='/x',
+                  type=0,
+                  mediaType=0)
+
+    def new_client():
+        client = Client(session=bot.client.session,
+                        device_id=bot.client.device_id,
+                        com_id=msg.ndcId)
+        client.login_sid(bot.sid, bot.uid)
+        return Context(msg=msg, client=client, ws=None)
+
+    def cached_client():
+        return bot.get_context(bot.client, msg, None)
+
+    print('new client:   ', measure(new_client))
+    print('cached client:', measure(cached_client))
+    await bot.client.session.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,87 @@
+"""
+Sending an image with the body encoded and signed in a thread against the
+body built in the loop through the JSON encoder, to a local stand-in of the
+api that drains the body. Shows the longest time the loop was blocked and
+the peak of traced memory.
+
+    PYTHONPATH=. python test/bench_media.py
+"""
+import asyncio
+import os
+import tracemalloc
+from base64 import b64encode
+from time import perf_counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client, api, codec
+
+
+async def drain(request):
+    async for _ in request.content.iter_chunked(1 << 16):
+        pass
+    return web.json_response({'api:statuscode': 0})
+
+
+async def send_in_loop(client: Client, media: bytes) -> None:
+    data = {
+        "content": None,
+        "mediaType": api.MediaType.GIF_AND_IMAGE,
+        "mediaUploadValueContentType": "image/jpg",
+        "mediaUhqEnabled": True,
+        "mediaUploadValue": b64encode(media).decode(),
+        "timestamp": 1
+    }
+    body = codec.dumps(data)
+    headers = {**client.headers, 'NDC-MSG-SIG': api.generate_signature(body)}
+    async with client.session.post(client.prefix + 'chat/thread/x/message',
+                                   data=body,
+                                   headers=headers) as response:
+        await response.read()
+
+
+async def measure(send) -> str:
+    longest = 0.0
+    done = False
+
+    async def tick():
+        nonlocal longest
+        last = perf_counter()
+        while not done:
+            await asyncio.sleep(0)
+            now = perf_counter()
+            longest = max(longest, now - last)
+            last = now
+
+    ticker = asyncio.ensure_future(tick())
+    await asyncio.sleep(0)
+    tracemalloc.start()
+    await send
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    done = True
+    await ticker
+    return f'blocked {longest * 1e3:6.1f} ms  peak {peak / 2**20:5.1f} MiB'
+
+
+async def main() -> None:
+    app = web.Application()
+    app.router.add_post('/{tail:.*}', drain)
+    server = TestServer(app)
+    await server.start_server(access_log=None)
+    client = Client()
+    client.prefix = f'http://{server.host}:{server.port}/'
+
+    for size in (1, 5, 20):
+        media = os.urandom(size * 2**20)
+        old = await measure(send_in_loop(client, media))
+        new = await measure(client.send_image(media, 'x'))
+        print(f'{size:2d} MiB  in loop: {old}  offloaded: {new}')
+
+    await client.session.close()
+    await server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
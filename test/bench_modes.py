@@ -0,0 +1,52 @@
+"""
+Time to build a page of 100 user profiles and a page of 100 chat messages in
+every response mode, and to read two fields of every profile.
+
+    PYTHONPATH=. python test/bench_modes.py
+"""
+from time import process_time
+
+from edamino import objects
+from edamino.views import Mode, get_builder
+from payloads import get_messages, get_profile, get_uid
+
+NUMBER = 200
+PROFILES = [get_profile(get_uid()) for _ in range(100)]
+MESSAGES = {'messageList': get_messages(100), 'paging': {}}
+
+
+def measure(call) -> float:
+    call()
+    started = process_time()
+    for _ in range(NUMBER):
+        call()
+    return (process_time() - started) / NUMBER * 1e3
+
+
+def read_fields(users) -> list:
+    return [(user.uid, user.nickname) for user in users]
+
+
+def read_keys(users) -> list:
+    return [(user['uid'], user['nickname']) for user in users]
+
+
+def main() -> None:
+    print(f'{"mode":10s} {"100 profiles ms":>16s} {"+ 2 fields ms":>14s} '
+          f'{"100 messages ms":>16s}')
+    for mode in Mode.ALL:
+        build = get_builder(mode)
+        read = read_keys if mode == Mode.RAW else read_fields
+
+        def build_profiles():
+            return [build(objects.UserProfile, user) for user in PROFILES]
+
+        profiles = measure(build_profiles)
+        profiles_read = measure(lambda: read(build_profiles()))
+        messages = measure(lambda: build(objects.Messages, MESSAGES))
+        print(f'{mode:10s} {profiles:16.2f} {profiles_read:14.2f} '
+              f'{messages:16.2f}')
+
+
+if __name__ == '__main__':
+    main()
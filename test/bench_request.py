@@ -0,0 +1,94 @@
+"""
+Preparation of the url and headers of a request with the shared header
+snapshots and url prefix against the copies and formatting they replaced,
+and a GET against a local stand-in of the api for scale.
+
+    PYTHONPATH=. python test/bench_request.py
+"""
+import asyncio
+from copy import copy
+from time import perf_counter
+from timeit import repeat
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client, api, codec
+
+NUMBER = 20000
+REQUESTS = 2000
+CASES = (
+    ('GET', {}),
+    ('POST json', {
+        'json': {
+            'content': 'hi',
+            'type': 0
+        }
+    }),
+    ('upload', {
+        'content_type': 'image/png'
+    }),
+)
+
+
+def prepare_copies(client, url, json=None, content_type=None):
+    headers = copy(client.headers)
+    url = f"https://service.narvii.com/api/v1/{client.ndc_id}/s/{url}"
+    data = None
+    if json is not None:
+        data = codec.dumps(json)
+        headers['NDC-MSG-SIG'] = api.generate_signature(data)
+    if content_type is not None:
+        headers = copy(client.headers)
+        headers['Content-Type'] = content_type
+    return url, headers, data
+
+
+def prepare_snapshots(client, url, json=None, content_type=None):
+    if content_type is not None:
+        headers = client.get_headers(content_type)
+    else:
+        headers = client.headers
+    url = client.prefix + url
+    data = None
+    if json is not None:
+        data, signature = api.encode_json(json)
+        headers = {**headers, 'NDC-MSG-SIG': signature}
+    return url, headers, data
+
+
+def measure(call) -> float:
+    return min(repeat(call, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+async def main() -> None:
+    client = Client(com_id=123)
+    client.login_sid('sid' * 20, 'uid')
+    for name, kwargs in CASES:
+        old = measure(
+            lambda: prepare_copies(client, 'user-profile/x', **kwargs))
+        new = measure(
+            lambda: prepare_snapshots(client, 'user-profile/x', **kwargs))
+        print(f'{name:10s} copies {old:5.2f} us  snapshots {new:5.2f} us')
+
+    async def respond(request):
+        return web.json_response({'api:statuscode': 0})
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', respond)
+    server = TestServer(app)
+    await server.start_server(access_log=None)
+    client.prefix = f'http://{server.host}:{server.port}/'
+    for _ in range(100):
+        await client.request('GET', 'user-profile/x')
+    started = perf_counter()
+    for _ in range(REQUESTS):
+        await client.request('GET', 'user-profile/x')
+    elapsed = (perf_counter() - started) / REQUESTS * 1e6
+    print(f'GET against a local stand-in: {elapsed:.0f} us/request')
+    await client.session.close()
+    await server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+"""
+Command lookup of the router against the startswith scan over every handler
+it replaced. Every handler has two commands and the message matches the
+last registered one.
+
+    PYTHONPATH=. python test/bench_router.py
+"""
+from timeit import repeat
+
+from edamino.router import CommandRouter
+
+NUMBER = 2000
+
+
+def measure(call) -> float:
+    return min(repeat(call, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+def main() -> None:
+    for count in (10, 100, 1000):
+        handlers = [(i, [f'/cmd{i:04d}', f'/alias{i:04d}'])
+                    for i in range(count)]
+        router = CommandRouter()
+        for handler, commands in handlers:
+            router.add(handler, commands)
+        content = f'/cmd{count - 1:04d} some arguments here'
+
+        def scan():
+            for handler, commands in handlers:
+                matches = [content.startswith(c) for c in commands]
+                if any(matches):
+                    return handler, commands[matches.index(True)]
+
+        def match():
+            for found in router.match(content):
+                return found
+
+        assert scan() == match()
+        print(f'{count:5d} commands: scan {measure(scan):8.2f} us  '
+              f'router {measure(match):6.2f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Throughput of GET requests at several concurrencies for connection pool
+limits of the session, against a local stand-in of the api answering after
+20 ms.
+
+    PYTHONPATH=. python test/bench_session.py
+"""
+import asyncio
+from time import perf_counter
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client
+from edamino.api import SessionConfig
+
+LATENCY = 0.02
+CONFIGS = (
+    ('limit 20', SessionConfig(limit=20)),
+    ('default (100)', SessionConfig()),
+    ('limit 500', SessionConfig(limit=500)),
+)
+
+
+async def measure(client: Client, concurrency: int) -> float:
+    count = max(concurrency * 4, 40)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def get():
+        async with semaphore:
+            # Distinct urls, so single-flight does not merge them.
+            await client.request('GET', f'user-profile/{next(ids)}')
+
+    ids = iter(range(count))
+    started = perf_counter()
+    await asyncio.gather(*(get() for _ in range(count)))
+    return count / (perf_counter() - started)
+
+
+async def main() -> None:
+
+    async def respond(request):
+        await asyncio.sleep(LATENCY)
+        return web.json_response({'api:statuscode': 0})
+
+    app = web.Application()
+    app.router.add_get('/{tail:.*}', respond)
+    server = TestServer(app)
+    await server.start_server(access_log=None)
+
+    for name, config in CONFIGS:
+        client = Client(config=config)
+        client.prefix = f'http://{server.host}:{server.port}/'
+        row = []
+        for concurrency in (1, 10, 100, 400):
+            rate = await measure(client, concurrency)
+            row.append(f'c={concurrency}: {rate:5.0f} req/s')
+        print(f'{name:14s}', '  '.join(row))
+        await client.session.close()
+    await server.close()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
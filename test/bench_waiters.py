@@ -0,0 +1,97 @@
+"""
+Time per frame with every waiter waiting for its own chat, for the indexed
+waiters against the single list of futures they replaced, where every frame
+wakes every waiter.
+
+    PYTHONPATH=. python test/bench_waiters.py
+"""
+import asyncio
+import random
+from time import perf_counter
+
+from edamino.objects import SocketAnswer
+from edamino.waiters import Waiters
+
+FRAMES = 200
+
+
+def get_frame(chat_id: str) -> dict:
+    return {
+        't': 1000,
+        'o': {
+            'ndcId': 1,
+            'chatMessage': {
+                'threadId': chat_id,
+                'uid': 'uid',
+                'content': 'hi',
+                'type': 0
+            }
+        }
+    }
+
+
+async def run_list(count: int, frames: list) -> float:
+    futures = []
+
+    async def wait(chat_id):
+        while True:
+            future = asyncio.get_event_loop().create_future()
+            futures.append(future)
+            answer = await future
+            if answer.o.chatMessage.threadId == chat_id:
+                return
+
+    tasks = [asyncio.ensure_future(wait(f'c{i}')) for i in range(count)]
+    await asyncio.sleep(0)
+    started = perf_counter()
+    for frame in frames:
+        answer = SocketAnswer(**frame)
+        for future in futures:
+            future.set_result(answer)
+        futures.clear()
+        # The waiters register again.
+        await asyncio.sleep(0)
+    elapsed = perf_counter() - started
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return elapsed / len(frames)
+
+
+async def run_indexed(count: int, frames: list) -> float:
+    waiters = Waiters()
+
+    async def wait(chat_id):
+        waiter = waiters.add(None, chat_id=chat_id)
+        try:
+            await waiter.future
+        finally:
+            waiters.discard(waiter)
+
+    tasks = [asyncio.ensure_future(wait(f'c{i}')) for i in range(count)]
+    await asyncio.sleep(0)
+    started = perf_counter()
+    for frame in frames:
+        if waiters:
+            waiters.notify(frame)
+        await asyncio.sleep(0)
+    elapsed = perf_counter() - started
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return elapsed / len(frames)
+
+
+async def main() -> None:
+    for count in (100, 1000, 5000):
+        frames = [
+            get_frame(f'c{random.randrange(count * 2)}') for _ in range(FRAMES)
+        ]
+        old = await run_list(count, frames)
+        new = await run_indexed(count, frames)
+        print(f'{count:5d} waiters: list {old * 1e3:7.2f} ms/frame  '
+              f'indexed {new * 1e3:6.3f} ms/frame')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
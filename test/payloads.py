@@ -0,0 +1,124 @@
+"""
+Synthetic api payloads for the benchmarks, shaped like the objects models.
+No captured traffic ships with the repo.
+"""
+from random import Random
+from string import ascii_letters
+from typing import Dict, List
+
+random = Random(1)
+
+
+def get_string(length: int) -> str:
+    return ''.join(random.choice(ascii_letters) for _ in range(length))
+
+
+def get_uid() -> str:
+    return '%08x-%04x-%04x-%04x-%012x' % tuple(
+        random.getrandbits(bits) for bits in (32, 16, 16, 16, 48))
+
+
+def get_author(uid: str) -> Dict:
+    return {
+        'uid': uid,
+        'nickname': get_string(12),
+        'icon': f'http://pm1.narvii.com/{get_string(40)}.jpg',
+        'level': random.randint(1, 20),
+        'reputation': random.randint(0, 99999),
+        'role': 0,
+        'status': 0,
+        'isNicknameVerified': False,
+        'accountMembershipStatus': 0,
+        'membershipStatus': 0,
+        'followingStatus': 0,
+        'isGlobal': False,
+        'ndcId': 1,
+        'avatarFrame': {
+            'frameId': get_uid(),
+            'resourceUrl': f'http://{get_string(60)}',
+            'version': 1,
+            'frameType': 0,
+            'status': 0,
+            'name': get_string(10),
+            'icon': f'http://{get_string(50)}'
+        }
+    }
+
+
+def get_profile(uid: str) -> Dict:
+    return {
+        **get_author(uid), 'content': get_string(300),
+        'createdTime': '2020-01-01T00:00:00Z',
+        'modifiedTime': '2021-01-01T00:00:00Z',
+        'userProfileExtensions': {
+            'privilegeOfCommentOnUserProfile': 1,
+            'customTitles': [{
+                'title': get_string(8),
+                'color': '#ffffff'
+            }]
+        },
+        'mediaList':
+        [[100, f'http://{get_string(40)}', None] for _ in range(3)],
+        'blogsCount': 3,
+        'commentsCount': 10,
+        'postsCount': 4,
+        'membersCount': 12,
+        'itemsCount': 1,
+        'onlineStatus': 1,
+        'aminoId': get_string(10),
+        'storiesCount': 0,
+        'joinedCount': 5,
+        'pushEnabled': True
+    }
+
+
+def get_message(uid: str, thread_id: str, number: int) -> Dict:
+    """
+    Chat message, every fourth one mentions a user.
+    """
+    minutes, seconds = divmod(number % 3600, 60)
+    mentions = [{'uid': get_uid()}] if number % 4 == 0 else None
+    return {
+        'threadId': thread_id,
+        'messageId': get_uid(),
+        'content': get_string(random.randint(10, 120)),
+        'type': 0,
+        'mediaType': 0,
+        'createdTime': f'2026-10-18T10:{minutes:02d}:{seconds:02d}Z',
+        'clientRefId': random.getrandbits(30),
+        'uid': uid,
+        'isHidden': False,
+        'includedInSummary': True,
+        'chatBubbleId': 'ed0a6a8b-17c9-4a2a-8d92-22d0f8f9d5e1',
+        'chatBubbleVersion': 1,
+        'author': get_author(uid),
+        'extensions': {
+            'mentionedArray': mentions
+        } if mentions else {}
+    }
+
+
+def get_frame(message: Dict) -> Dict:
+    return {
+        't': 1000,
+        'o': {
+            'ndcId': 1,
+            'chatMessage': message,
+            'alertOption': 1,
+            'membershipStatus': 0
+        }
+    }
+
+
+def get_messages(count: int,
+                 users: int = 200,
+                 threads: int = 20) -> List[Dict]:
+    """
+    Messages of ``users`` users in ``threads`` chats.
+    """
+    uids = [get_uid() for _ in range(users)]
+    thread_ids = uids[:threads]
+    return [
+        get_message(random.choice(uids), random.choice(thread_ids), number)
+        for number in range(count)
+    ]
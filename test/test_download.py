@@ -0,0 +1,173 @@
+import asyncio
+import os
+
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client
+from edamino.api import FileTooLarge, HtmlError, InvalidRequest
+
+BODY = os.urandom(1024 * 1024)
+
+
+def serve(path: str):
+    """
+    Routes of the stand-in file server, /file honours ranges and answers 416
+    past the end, /whole ignores them.
+    """
+
+    async def file(request):
+        return web.FileResponse(path)
+
+    async def whole(request):
+        return web.Response(body=BODY)
+
+    async def streamed(request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for start in range(0, len(BODY), 64 * 1024):
+            await response.write(BODY[start:start + 64 * 1024])
+        await response.write_eof()
+        return response
+
+    async def error(request):
+        return web.json_response(
+            {
+                'api:message': 'Not found.',
+                'api:statuscode': 404
+            }, status=404)
+
+    async def html(request):
+        return web.Response(text='<html>Bad gateway</html>',
+                            status=502,
+                            content_type='text/html')
+
+    app = web.Application()
+    app.router.add_get('/file', file)
+    app.router.add_get('/whole', whole)
+    app.router.add_get('/streamed', streamed)
+    app.router.add_get('/error', error)
+    app.router.add_get('/html', html)
+    return TestServer(app)
+
+
+def run(tmp_path, test):
+    source = tmp_path / 'source.bin'
+    source.write_bytes(BODY)
+
+    async def main():
+        server = serve(str(source))
+        await server.start_server()
+        try:
+            async with ClientSession() as session:
+                await test(Client(session=session),
+                           f'http://{server.host}:{server.port}')
+        finally:
+            await server.close()
+
+    asyncio.run(main())
+
+
+def test_download_to_memory_and_file(tmp_path):
+
+    async def test(client, url):
+        assert await client.download_from_link(f'{url}/file') == BODY
+
+        path = tmp_path / 'saved.bin'
+        download = await client.download_to_file(f'{url}/file', str(path))
+        assert path.read_bytes() == BODY
+        assert download.received == download.total == len(BODY)
+
+        chunks = [
+            chunk async for chunk in client.download(f'{url}/file',
+                                                     chunk_size=256 * 1024)
+        ]
+        assert b''.join(chunks) == BODY
+        assert all(len(chunk) <= 256 * 1024 for chunk in chunks)
+
+    run(tmp_path, test)
+
+
+def test_size_cap(tmp_path):
+
+    async def test(client, url):
+        # Known from the content length before the body is read.
+        download = client.download(f'{url}/file', max_size=1000)
+        with pytest.raises(FileTooLarge):
+            await download.read()
+        assert download.received == 0
+
+        # Counted while the body arrives.
+        download = client.download(f'{url}/streamed', max_size=100 * 1024)
+        with pytest.raises(FileTooLarge):
+            await download.read()
+        assert download.total is None
+        # It stops at the first chunk past the cap.
+        assert download.received <= 100 * 1024 + download.chunk_size
+
+        body = await client.download_from_link(f'{url}/file',
+                                               max_size=len(BODY))
+        assert body == BODY
+
+    run(tmp_path, test)
+
+
+def test_resume(tmp_path):
+
+    async def test(client, url):
+        path = tmp_path / 'partial.bin'
+        path.write_bytes(BODY[:300 * 1000])
+
+        download = await client.download_to_file(f'{url}/file',
+                                                 str(path),
+                                                 resume=True)
+        assert download.offset == 300 * 1000
+        assert download.received == len(BODY) - 300 * 1000
+        assert download.total == len(BODY)
+        assert path.read_bytes() == BODY
+
+        # Nothing is left, the server answers 416.
+        download = await client.download_to_file(f'{url}/file',
+                                                 str(path),
+                                                 resume=True)
+        assert download.received == 0
+        assert download.total == len(BODY)
+        assert path.read_bytes() == BODY
+
+    run(tmp_path, test)
+
+
+def test_resume_with_range_ignored(tmp_path):
+
+    async def test(client, url):
+        path = tmp_path / 'partial.bin'
+        path.write_bytes(b'x' * 500)
+
+        download = await client.download_to_file(f'{url}/whole',
+                                                 str(path),
+                                                 resume=True)
+        assert download.offset == 0
+        assert download.received == len(BODY)
+        assert path.read_bytes() == BODY
+
+    run(tmp_path, test)
+
+
+def test_errors(tmp_path):
+
+    async def test(client, url):
+        with pytest.raises(InvalidRequest) as info:
+            await client.download_from_link(f'{url}/error')
+        assert info.value.status == 404
+        assert info.value.http_status == 404
+
+        with pytest.raises(HtmlError):
+            await client.download_from_link(f'{url}/html')
+
+        path = tmp_path / 'missing.bin'
+        with pytest.raises(InvalidRequest):
+            await client.download_to_file(f'{url}/error', str(path))
+        assert not path.exists()
+
+    run(tmp_path, test)
@@ -0,0 +1,184 @@
+import asyncio
+
+import pytest
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client
+from edamino.api import InvalidRequest
+from edamino.flights import SingleFlight
+from edamino.retry import RetryPolicy
+
+
+class Server:
+    """
+    Stand-in of the api counting the requests it gets, every response is
+    delayed so that identical requests overlap.
+    """
+
+    __slots__ = ('server', 'hits', 'delay')
+
+    def __init__(self, delay: float = 0.2) -> None:
+        self.hits = 0
+        self.delay = delay
+        app = web.Application()
+        app.router.add_get('/profile', self.profile)
+        app.router.add_get('/error', self.error)
+        self.server = TestServer(app)
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.server.host}:{self.server.port}'
+
+    async def profile(self, request):
+        self.hits += 1
+        await asyncio.sleep(self.delay)
+        return web.json_response(
+            {'userProfile': {
+                'uid': 'uid',
+                'nickname': 'nickname'
+            }})
+
+    async def error(self, request):
+        self.hits += 1
+        await asyncio.sleep(self.delay)
+        return web.json_response(
+            {
+                'api:message': 'Invalid request.',
+                'api:statuscode': 104
+            },
+            status=400)
+
+    async def __aenter__(self) -> 'Server':
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.server.close()
+
+
+def get_client(session: ClientSession,
+               flights: SingleFlight,
+               proxy=None) -> Client:
+    client = Client(session=session,
+                    proxy=proxy,
+                    retry=RetryPolicy(attempts=1))
+    client.flights = flights
+    return client
+
+
+def run(test):
+
+    async def main():
+        async with Server() as server, ClientSession() as session:
+            await test(server, session, SingleFlight())
+
+    asyncio.run(main())
+
+
+def test_identical_requests_are_coalesced():
+
+    async def test(server, session, flights):
+        client = get_client(session, flights)
+        url = f'{server.url}/profile'
+        results = await asyncio.gather(
+            *(client.request('GET', url, full_url=True) for _ in range(5)))
+
+        assert server.hits == 1
+        assert flights.started == 1
+        assert flights.coalesced == 4
+        assert not flights.flights
+        assert all(result == results[0] for result in results)
+        # The joined callers get their own copy.
+        assert len({id(result) for result in results}) == 5
+        assert len({id(result['userProfile']) for result in results}) == 5
+
+        await client.request('GET', url, full_url=True)
+        assert server.hits == 2
+
+    run(test)
+
+
+def test_error_reaches_every_caller():
+
+    async def test(server, session, flights):
+        client = get_client(session, flights)
+        url = f'{server.url}/error'
+        results = await asyncio.gather(*(client.request('GET',
+                                                        url,
+                                                        full_url=True)
+                                         for _ in range(3)),
+                                       return_exceptions=True)
+
+        assert server.hits == 1
+        assert all(isinstance(result, InvalidRequest) for result in results)
+        assert all(result.status == 104 for result in results)
+        assert not flights.flights
+
+    run(test)
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+
+    async def test(server, session, flights):
+        client = get_client(session, flights)
+        url = f'{server.url}/profile'
+        first = asyncio.ensure_future(client.request('GET', url,
+                                                     full_url=True))
+        second = asyncio.ensure_future(
+            client.request('GET', url, full_url=True))
+        await asyncio.sleep(0.05)
+        first.cancel()
+
+        result = await second
+        assert result['userProfile']['uid'] == 'uid'
+        assert first.cancelled()
+        assert server.hits == 1
+
+    run(test)
+
+
+def test_call_is_cancelled_without_callers():
+
+    async def test(server, session, flights):
+        client = get_client(session, flights)
+        url = f'{server.url}/profile'
+        callers = [
+            asyncio.ensure_future(client.request('GET', url, full_url=True))
+            for _ in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+
+        assert not flights.flights
+        with pytest.raises(asyncio.CancelledError):
+            await callers[0]
+
+    run(test)
+
+
+def test_sessions_proxies_and_sids_are_not_shared():
+
+    async def test(server, session, flights):
+        url = f'{server.url}/profile'
+        async with ClientSession() as other_session:
+            client = get_client(session, flights)
+            signed = get_client(session, flights)
+            signed.login_sid('sid', 'uid')
+            clients = (
+                client,
+                get_client(other_session, flights),
+                # The stand-in serves the absolute urls sent to a proxy too.
+                get_client(session, flights, proxy=server.url),
+                signed,
+                get_client(session, flights),
+            )
+            await asyncio.gather(*(client.request('GET', url, full_url=True)
+                                   for client in clients))
+
+        assert server.hits == 4
+        assert flights.coalesced == 1
+
+    run(test)
@@ -0,0 +1,148 @@
+import asyncio
+import os
+from time import time
+
+from aiohttp import ClientSession, web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client, codec
+from edamino.media import MediaCache
+
+IMAGE = os.urandom(500 * 1000)
+BUBBLE = os.urandom(1000)
+
+
+class Server:
+    """
+    Stand-in of the upload and message endpoints, every upload gets a new
+    media value.
+    """
+
+    __slots__ = ('server', 'uploads', 'messages')
+
+    def __init__(self) -> None:
+        self.uploads = []
+        self.messages = []
+        app = web.Application(client_max_size=2 * 1024 * 1024)
+        app.router.add_post('/s/media/upload{target:.*}', self.upload)
+        app.router.add_post('/s/chat/thread/{chat_id}/message', self.message)
+        self.server = TestServer(app)
+
+    async def upload(self, request):
+        body = await request.read()
+        self.uploads.append((request.match_info['target'], body))
+        return web.json_response(
+            {'mediaValue': f'http://pm1.narvii.com/{len(self.uploads)}.jpg'})
+
+    async def message(self, request):
+        self.messages.append(await request.json())
+        return web.json_response({'api:statuscode': 0})
+
+    async def __aenter__(self) -> 'Server':
+        await self.server.start_server()
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.server.close()
+
+    def get_client(self, session: ClientSession,
+                   media_cache: MediaCache) -> Client:
+        client = Client(session=session, media_cache=media_cache)
+        client.prefix = f'http://{self.server.host}:{self.server.port}/s/'
+        return client
+
+
+def run(test):
+
+    async def main():
+        async with Server() as server, ClientSession() as session:
+            await test(server, session)
+
+    asyncio.run(main())
+
+
+def test_same_file_is_uploaded_once():
+
+    async def test(server, session):
+        cache = MediaCache()
+        client = server.get_client(session, cache)
+        for _ in range(5):
+            await client.send_image(IMAGE, 'chat')
+        await client.send_gif(IMAGE, 'chat')
+        assert await client.upload_image_bubble(BUBBLE) == \
+            await client.upload_image_bubble(BUBBLE)
+
+        # The image, the same bytes as a gif and the bubble.
+        assert len(server.uploads) == 3
+        assert server.uploads[0] == ('', IMAGE)
+        assert server.uploads[2] == ('/target/chat-bubble-thumbnail', BUBBLE)
+        assert cache.hits == 5
+        assert cache.misses == 3
+        assert cache.hit_rate == 5 / 8
+
+        assert len(server.messages) == 6
+        assert all('mediaUploadValue' not in message
+                   for message in server.messages)
+        assert {message['mediaValue']
+                for message in server.messages[:5]
+                } == {'http://pm1.narvii.com/1.jpg'}
+
+    run(test)
+
+
+def test_expired_entries_are_uploaded_again():
+
+    async def test(server, session):
+        cache = MediaCache(ttl=0.1)
+        client = server.get_client(session, cache)
+        await client.send_image(IMAGE, 'chat')
+        await client.send_image(IMAGE, 'chat')
+        assert len(server.uploads) == 1
+
+        await asyncio.sleep(0.15)
+        await client.send_image(IMAGE, 'chat')
+        assert len(server.uploads) == 2
+        assert server.messages[2]['mediaValue'] == \
+            'http://pm1.narvii.com/2.jpg'
+
+    run(test)
+
+
+def test_entries_are_loaded_from_path(tmp_path):
+
+    async def test(server, session):
+        path = str(tmp_path / 'media.json')
+        client = server.get_client(session, MediaCache(path=path))
+        await client.send_image(IMAGE, 'chat')
+        await client.upload_image_bubble(BUBBLE)
+
+        # A restart.
+        cache = MediaCache(path=path)
+        assert len(cache) == 2
+        client = server.get_client(session, cache)
+        await client.send_image(IMAGE, 'chat')
+        assert len(server.uploads) == 2
+        assert cache.hits == 1
+        assert server.messages[1]['mediaValue'] == \
+            'http://pm1.narvii.com/1.jpg'
+
+        # Entries that expired while the bot was down are not loaded.
+        entries = codec.loads(open(path).read())
+        key = next(iter(entries))
+        entries[key][0] = time() - 1
+        with open(path, 'w') as file:
+            file.write(codec.dumps(entries))
+        assert len(MediaCache(path=path)) == 1
+
+    run(test)
+
+
+def test_without_cache_the_image_is_inline():
+
+    async def test(server, session):
+        client = server.get_client(session, None)
+        await client.send_image(BUBBLE, 'chat')
+        assert not server.uploads
+        assert 'mediaUploadValue' in server.messages[0]
+
+    run(test)
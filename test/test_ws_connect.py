@@ -0,0 +1,151 @@
+import asyncio
+import socket
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from edamino import Client
+from edamino.api import WebSocketConnectError
+from edamino.connection import Endpoints
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def socket_handler(delay: float, opened: set):
+
+    async def handler(request):
+        await asyncio.sleep(delay)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        opened.add(ws)
+        try:
+            await ws.receive()
+        finally:
+            opened.discard(ws)
+        return ws
+
+    return handler
+
+
+async def forbidden(request):
+    return web.Response(status=403)
+
+
+async def start(handler) -> TestServer:
+    app = web.Application()
+    app.router.add_get('/', handler)
+    server = TestServer(app)
+    await server.start_server()
+    return server
+
+
+def get_url(server: TestServer) -> str:
+    return f'http://{server.host}:{server.port}'
+
+
+async def with_client(test):
+    client = Client()
+    client.login_sid('sid', 'uid')
+    try:
+        await test(client)
+    finally:
+        await client.session.close()
+
+
+def test_fastest_endpoint_wins_and_goes_first():
+
+    async def test(client):
+        opened = set()
+        slow = await start(socket_handler(1.5, opened))
+        fast = await start(socket_handler(0.05, opened))
+        rejecting = await start(forbidden)
+        refused = f'http://127.0.0.1:{get_free_port()}'
+        endpoints = Endpoints(
+            [get_url(slow), refused,
+             get_url(rejecting),
+             get_url(fast)])
+        try:
+            started = asyncio.get_event_loop().time()
+            ws = await client.ws_connect(endpoints=endpoints, stagger=0.1)
+            elapsed = asyncio.get_event_loop().time() - started
+            assert ws._response.url.port == fast.port
+            assert elapsed < 1
+            await ws.close()
+
+            assert endpoints.failures[refused] == 1
+            assert endpoints.failures[get_url(rejecting)] == 1
+            assert endpoints.ordered()[0] == get_url(fast)
+
+            started = asyncio.get_event_loop().time()
+            ws = await client.ws_connect(endpoints=endpoints, stagger=0.1)
+            assert asyncio.get_event_loop().time() - started < 0.5
+            assert ws._response.url.port == fast.port
+            await ws.close()
+        finally:
+            for server in (slow, fast, rejecting):
+                await server.close()
+
+    asyncio.run(with_client(test))
+
+
+def test_only_failing_endpoints_raise():
+
+    async def test(client):
+        rejecting = await start(forbidden)
+        refused = f'http://127.0.0.1:{get_free_port()}'
+        endpoints = Endpoints([refused, get_url(rejecting)])
+        try:
+            with pytest.raises(WebSocketConnectError):
+                await client.ws_connect(endpoints=endpoints, stagger=0.1)
+        finally:
+            await rejecting.close()
+
+    asyncio.run(with_client(test))
+
+
+def test_late_winner_is_closed():
+
+    async def test(client):
+        opened = set()
+        first = await start(socket_handler(0.05, opened))
+        second = await start(socket_handler(0.05, opened))
+        endpoints = Endpoints([get_url(first), get_url(second)])
+        try:
+            ws = await client.ws_connect(endpoints=endpoints, stagger=0)
+            await asyncio.sleep(0.2)
+            assert len(opened) == 1
+            await ws.close()
+            await asyncio.sleep(0.1)
+            assert not opened
+        finally:
+            await first.close()
+            await second.close()
+
+    asyncio.run(with_client(test))
+
+
+def test_cancelling_the_caller_cancels_the_attempts():
+
+    async def test(client):
+        opened = set()
+        slow = await start(socket_handler(1, opened))
+        endpoints = Endpoints([get_url(slow), get_url(slow) + '/'])
+        try:
+            task = asyncio.ensure_future(
+                client.ws_connect(endpoints=endpoints, stagger=0.05))
+            await asyncio.sleep(0.2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert task.cancelled()
+            await asyncio.sleep(1.2)
+            assert not opened
+        finally:
+            await slow.close()
+
+    asyncio.run(with_client(test))